@@ -0,0 +1,198 @@
+'''Module provides cache backends and cache manager.
+
+Each backend implements the same simple interface::
+
+    cache = MemoryCache(max_entries=1000)
+    cache.set('key', 'value', ttl=60)
+    cache.get('key')  # returns 'value' during 60 seconds
+    cache.delete('key')
+
+Backends are registered in cache manager by name and can be replaced by the
+application on startup. By default there is only 'default' backend stores data
+in process memory::
+
+    from lighty.cache import FileCache, manager
+    manager.register('default', FileCache('/tmp/lighty-cache'))
+    manager.get_cache().set('key', 'value')
+'''
+import collections
+import hashlib
+import os
+import os.path
+import pickle
+import tempfile
+import threading
+import time
+
+
+class Cache(object):
+    '''Base class for cache backends
+    '''
+
+    def get(self, key, default=None):
+        '''Get value from cache
+
+        Args:
+            key - cache key
+            default - value returned if there is no valid cache entry
+
+        Returns:
+            cached value or default
+        '''
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl=None):
+        '''Store value in cache
+
+        Args:
+            key - cache key
+            value - value to store
+            ttl - time to live in seconds or None to store value forever
+        '''
+        raise NotImplementedError()
+
+    def delete(self, key):
+        '''Remove value from cache
+        '''
+        raise NotImplementedError()
+
+    def clear(self):
+        '''Remove all the values from cache
+        '''
+        raise NotImplementedError()
+
+    @staticmethod
+    def get_expires(ttl):
+        '''Get expiration time for time to live specified
+        '''
+        return None if ttl is None else time.time() + float(ttl)
+
+
+class MemoryCache(Cache):
+    '''In-process cache with least recently used entries eviction. Values are
+    stored as is, without any serialization, so don't change cached mutable
+    values.
+    '''
+
+    def __init__(self, max_entries=1000):
+        '''Create new memory cache keeps max_entries values
+        '''
+        super(MemoryCache, self).__init__()
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires is not None and expires <= time.time():
+                return default
+            # Move entry to the end as most recently used
+            self.entries[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (self.get_expires(ttl), value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class FileCache(Cache):
+    '''Cache stores pickled values in separate files inside the directory.
+    Cache can be shared between processes on the same host.
+    '''
+
+    def __init__(self, cache_dir):
+        '''Create new file cache stores data in directory specified
+        '''
+        super(FileCache, self).__init__()
+        self.cache_dir = cache_dir
+        if not os.path.exists(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                pass
+
+    def get_path(self, key):
+        '''Get file path for cache key
+        '''
+        if not isinstance(key, bytes):
+            # Byte string keys are hashed as is
+            key = key.encode('utf-8')
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(key).hexdigest() + '.cache')
+
+    def get(self, key, default=None):
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as file:
+                expires, value = pickle.load(file)
+        except Exception:
+            return default
+        if expires is not None and expires <= time.time():
+            self.delete(key)
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        try:
+            handle, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(handle, 'wb') as file:
+                pickle.dump((self.get_expires(ttl), value), file,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_path, self.get_path(key))
+        except (IOError, OSError):
+            pass
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.cache'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, file_name))
+                except OSError:
+                    pass
+
+
+class CacheManager(object):
+    '''Class used for cache backends management
+    '''
+
+    def __init__(self):
+        '''Create new cache manager with default memory cache
+        '''
+        super(CacheManager, self).__init__()
+        self.backends = {'default': MemoryCache()}
+
+    def register(self, name, backend):
+        '''Register cache backend with name specified. Backend registered
+        with name 'default' is used when backend name is not specified
+        '''
+        self.backends[name] = backend
+
+    def get_cache(self, name='default'):
+        '''Get cache backend by name
+        '''
+        if name not in self.backends:
+            raise LookupError("Cache '%s' is not registered" % name)
+        return self.backends[name]
+
+manager = CacheManager()
@@ -1,10 +1,9 @@
 '''Package contains settings management functions
 '''
-import collections
 import itertools
 import os
 import sys
-from .utils import dict_keys
+from .utils import collections_abc, dict_keys
 try:
     # for python 2
     import ConfigParser
@@ -12,16 +11,13 @@ try:
 except:
     # for python 3
     import configparser
-    Parser = configparser.SafeConfigParser
+    Parser = configparser.ConfigParser
 
 
-class Settings(collections.Mapping):
+class Settings(collections_abc.Mapping):
     '''Get settings for class
     '''
-    __slots__ = ('__init__', '__contains__', '__getattr__', '__getitem__',
-                 '__eq__', '__iter__', '__len__', '__ne__', '_sections',
-                 '_settings', 'get', 'items', 'keys', 'section', 'sections',
-                 'values', )
+    __slots__ = ('_sections', '_settings', )
 
     def __init__(self, main_config, defaults={}):
         '''Load main config, parse it and then trying to load applications from
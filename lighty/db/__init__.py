@@ -21,6 +21,12 @@ create simple User entity with name, password and age::
         def __str__(self):
             return "%s %d" % (self.name, self.age)
 
+Fields with db_index, unique or primary_key options are indexed. Compound
+indexes can be declared with _indexes attribute, see lighty.db.models.Index.
+Declared indexes are created by sync_indexes command from lighty.db
+application. In debug mode queries on fields without indexes are reported
+with RuntimeWarning once for each field.
+
 This class can be easy mapped from database and into database. As example to
 store the data we need just:::
 
@@ -36,6 +42,11 @@ or for step by step properties setting::
 
 save() method is just an alias for put().
 
+To store a lot of entities use put_many() that sends them to database by
+batches::
+
+    User.put_many([User(name=name, age=18) for name in names])
+
 To get single entity from database by you can use get() method with name of the
 fields and their values to identify the record:::
 
@@ -85,6 +96,13 @@ and slicing::
 
     User.all()[0:10] # Select first 10 user
 
+Slices are selected on server with skip and limit, but skipping is slow for
+deep pages of large collections. To iterate over such collections use pages,
+that selects each next page after the last item of previous one::
+
+    for page in User.all().order_by(User.age).pages(100):
+        process(page)
+
 You can also make operations with queries::
 
     query = User.all().where(User.age > 17) & User.all().where(User.age <= 20)
@@ -111,12 +129,30 @@ Also you can update data for query::
 
     User.all().where(User.age < 18).update(age=18)
 '''
+from . import backend
 from .backend import manager
 
 
 def init_db_manager(settings):
-    '''Get database connections from settings
+    '''Get database connections from settings. Each DATABASE:name section
+    describes a datastore. Datastores on the same server with the same options
+    share one connections pool::
+
+        [DATABASE:default]
+        db_name: app
+        host: localhost
+        port: 27017
+        max_pool_size: 50
+        connect_timeout: 2000
+        wait_queue_timeout: 1000
+
+    Queries on fields without indexes are reported only if debug setting is
+    True.
     '''
+    try:
+        backend.check_unindexed = str(settings['debug']).lower() == 'true'
+    except KeyError:
+        backend.check_unindexed = False
     for section in settings.sections():
         if section.startswith('DATABASE:'):
             name = section.replace('DATABASE:', '')
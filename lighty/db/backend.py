@@ -1,26 +1,184 @@
 '''Define class for getting and storing data
 '''
 import datetime
+import itertools
 import operator
+import os
+import re
+import threading
+import warnings
 
 import bson
 
 from ..utils import string_types
 from .fields import Field
-from .functor import FieldFunctor
+from .functor import BaseField, FieldFunctor
+from .query import Query
+
+COMPARISON_OPERATORS = {
+        operator.__gt__: '$gt',
+        operator.__lt__: '$lt',
+        operator.__ge__: '$gte',
+        operator.__le__: '$lte',
+        operator.__ne__: '$ne',
+}
+'''Query operators for comparison of field with value'''
+LOGICAL_OPERATORS = (operator.__and__, operator.__or__, operator.__xor__, )
+CLIENT_OPTIONS = {
+        'max_pool_size': 'maxPoolSize',
+        'min_pool_size': 'minPoolSize',
+        'max_idle_time': 'maxIdleTimeMS',
+        'connect_timeout': 'connectTimeoutMS',
+        'socket_timeout': 'socketTimeoutMS',
+        'wait_queue_timeout': 'waitQueueTimeoutMS',
+        'server_selection_timeout': 'serverSelectionTimeoutMS',
+}
+'''Datastore settings passed to MongoClient. Timeouts are in milliseconds'''
+unindexed_warnings = set()
+'''Model and field names already reported as queried without index'''
+checked_filters = set()
+'''Model names and filter shapes already checked for unindexed fields'''
+check_unindexed = False
+'''Warn about queries on fields without index. Enabled by debug setting'''
+
+
+def get_filter_fields(document):
+    '''Get names of all the fields used in filter document
+    '''
+    names = set()
+    for key, value in document.items():
+        if key in ('$and', '$or', '$nor'):
+            for condition in value:
+                names |= get_filter_fields(condition)
+        elif not key.startswith('$'):
+            names.add(key)
+    return names
+
+
+def get_filter_shape(document):
+    '''Get shape of filter document: field names and logical operators
+    structure without values
+
+    Returns:
+        hashable tuple
+    '''
+    return tuple([(key, tuple([get_filter_shape(condition)
+                               for condition in document[key]]))
+                  if key in ('$and', '$or', '$nor') else key
+                  for key in sorted(document)])
+
+
+def get_client_options(options):
+    '''Get MongoClient options from datastore settings
+
+    Args:
+        options - dictionary with datastore settings
+
+    Returns:
+        tuple (host, port, client options dictionary)
+    '''
+    host = options.get('host') or 'localhost'
+    port = int(options['port']) if options.get('port') else 27017
+    client_options = dict([(CLIENT_OPTIONS[name], int(options[name]))
+                           for name in CLIENT_OPTIONS
+                           if options.get(name) not in (None, '')])
+    return host, port, client_options
+
+
+class ClientRegistry(object):
+    '''Registry keeps one pooled client for each host, port and options, so
+    all the datastores on the same server share one connections pool.
+
+    Clients created before fork can't be used in child process, so registry
+    drops them when process id changes and creates new ones on request.
+    '''
+
+    def __init__(self):
+        super(ClientRegistry, self).__init__()
+        self.clients = {}
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def create_client(host, port, options):
+        '''Create new client. Connection class is used for old pymongo
+        versions without MongoClient
+        '''
+        try:
+            from pymongo import MongoClient
+        except ImportError:
+            from pymongo import Connection
+            return Connection(host, port, **(
+                    {'max_pool_size': options['maxPoolSize']}
+                    if 'maxPoolSize' in options else {}))
+        return MongoClient(host, port, **options)
+
+    def get_client(self, host='localhost', port=27017, **options):
+        '''Get client for host, port and options specified
+
+        Args:
+            host - server host name or mongodb:// URI
+            port - server port
+            options - MongoClient keyword arguments
+
+        Returns:
+            shared client instance
+        '''
+        key = (host, port, tuple(sorted(options.items())))
+        with self.lock:
+            if self.pid != os.getpid():
+                # Connections of parent process must not be used after fork
+                self.clients = {}
+                self.pid = os.getpid()
+            if key not in self.clients:
+                self.clients[key] = self.create_client(host, port, options)
+            return self.clients[key]
+
+    def close(self):
+        '''Close all the clients
+        '''
+        with self.lock:
+            if self.pid == os.getpid():
+                for client in self.clients.values():
+                    client.close()
+            self.clients = {}
+
+
+clients = ClientRegistry()
 
 
 class Datastore(object):
     ''' Class used to get and put data into database
     '''
-    __slots__ = ('name', 'db_name', 'db', 'get', 'put', )
+    __slots__ = ('name', 'db_name', 'options', 'pid', '_db', )
 
     def __init__(self, name, db_name, **kwargs):
-        from pymongo import Connection
-        connection = Connection()
+        '''Create datastore
+
+        Args:
+            name - datastore name
+            db_name - database name
+            kwargs - connection options: host, port, max_pool_size,
+                min_pool_size, max_idle_time and timeouts in milliseconds:
+                connect_timeout, socket_timeout, wait_queue_timeout and
+                server_selection_timeout
+        '''
         self.name = name
         self.db_name = db_name
-        self.db = connection[db_name]
+        self.options = get_client_options(kwargs)
+        self.pid = None
+        self._db = None
+
+    @property
+    def db(self):
+        '''Database object. It's taken from shared client on first access and
+        after fork
+        '''
+        if self.pid != os.getpid():
+            host, port, options = self.options
+            self._db = clients.get_client(host, port, **options)[self.db_name]
+            self.pid = os.getpid()
+        return self._db
 
     def get(self, model, kwargs):
         '''Get item using number of arguments
@@ -34,10 +192,119 @@ class Datastore(object):
         '''
         if '_id' in item:
             item['_id'] = bson.objectid.ObjectId(item['_id'])
-        return self.db[model.entity_name()].save(item)
+        collection = self.db[model.entity_name()]
+        if not hasattr(collection, 'insert_one'):
+            return collection.save(item)
+        elif '_id' in item:
+            collection.replace_one({'_id': item['_id']}, item, upsert=True)
+            return item['_id']
+        return collection.insert_one(item).inserted_id
+
+    def put_many(self, model, items, batch_size=1000, ordered=True):
+        '''Put items into datastore with bulk writes. Items with keys replace
+        existing ones and items without keys are inserted
+
+        Args:
+            model - model class
+            items - list of dictionaries
+            batch_size - number of items sent in one request
+            ordered - stop on first error or try to write all the items
+
+        Returns:
+            list of items keys
+        '''
+        collection = self.db[model.entity_name()]
+        for item in items:
+            if '_id' in item:
+                item['_id'] = bson.objectid.ObjectId(item['_id'])
+        if not hasattr(collection, 'bulk_write'):
+            Datastore.put_many_legacy(collection, items, batch_size, ordered)
+            return [item['_id'] for item in items]
+        from pymongo import InsertOne, ReplaceOne
+        for start in range(0, len(items), batch_size):
+            # InsertOne sets generated key into item
+            collection.bulk_write([ReplaceOne({'_id': item['_id']}, item,
+                                              upsert=True) if '_id' in item
+                                   else InsertOne(item)
+                                   for item in items[start:start +
+                                                     batch_size]],
+                                  ordered=ordered)
+        return [item['_id'] for item in items]
+
+    @staticmethod
+    def put_many_legacy(collection, items, batch_size, ordered):
+        '''Put items with old pymongo API. Items are written in input order:
+        each batch is split into runs of new items inserted with one request
+        and items with keys saved one by one. Without ordered writes continue
+        after error and the first error is raised at the end
+        '''
+        from pymongo.errors import PyMongoError
+        error = None
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            for saved, run in itertools.groupby(batch,
+                                                lambda item: '_id' in item):
+                # Items with keys are saved by one, new items are inserted
+                # with one request
+                for chunk in ([[item] for item in run] if saved
+                              else [list(run)]):
+                    try:
+                        if saved:
+                            collection.save(chunk[0])
+                        else:
+                            collection.insert(chunk,
+                                              continue_on_error=not ordered)
+                    except PyMongoError as exc:
+                        if ordered:
+                            raise
+                        error = error or exc
+        if error is not None:
+            raise error
 
     def delete(self, model, **kwargs):
-        return self.db[model.entity_name()].remove(kwargs)
+        collection = self.db[model.entity_name()]
+        if not hasattr(collection, 'delete_many'):
+            return collection.remove(kwargs)
+        return collection.delete_many(kwargs).deleted_count
+
+    @staticmethod
+    def get_bulk_filter(query):
+        '''Get filter document for query update or delete
+        '''
+        if query.offset or query.limit is not None:
+            raise AttributeError('Sliced query can not be updated or deleted')
+        document = Datastore.build_query(query)[0]
+        if check_unindexed:
+            Datastore.check_indexes(query.model, document)
+        return document
+
+    def update_many(self, query, values):
+        '''Set values for all the items selected by query with one request
+
+        Returns:
+            number of items matched by query
+        '''
+        document = Datastore.get_bulk_filter(query)
+        values = dict([(name, Datastore.process_value(value))
+                       for name, value in values.items()])
+        collection = self.db[query.model.entity_name()]
+        if not hasattr(collection, 'update_many'):
+            return collection.update(document, {'$set': values},
+                                     multi=True)['n']
+        return collection.update_many(document,
+                                      {'$set': values}).matched_count
+
+    def delete_many(self, query):
+        '''Delete all the items selected by query with one request
+
+        Returns:
+            number of items deleted
+        '''
+        document = Datastore.get_bulk_filter(query)
+        collection = self.db[query.model.entity_name()]
+        if not hasattr(collection, 'delete_many'):
+            return collection.remove(document)['n']
+        return collection.delete_many(document).deleted_count
 
     @staticmethod
     def get_datastore_operation(operation, operand=None):
@@ -52,6 +319,15 @@ class Datastore(object):
                 operator.__ge__: '(%s >= %s)',
                 operator.__le__: '(%s <= %s)',
                 operator.__eq__: '(%s == %s)',
+                operator.__ne__: '(%s != %s)',
+                operator.__xor__: '(!(%s) != !(%s))',
+                operator.__add__: '(%s + %s)',
+                operator.__sub__: '(%s - %s)',
+                operator.__mul__: '(%s * %s)',
+                operator.__truediv__: '(%s / %s)',
+                operator.__floordiv__: 'Math.floor(%s / %s)',
+                operator.__mod__: '(%s %% %s)',
+                operator.__pow__: 'Math.pow(%s, %s)',
                 operator.__contains__: (
                                     '(%s && (new RegExp(%s, "ig")).exec(%s))'
                                     if isinstance(operand, string_types)
@@ -75,12 +351,13 @@ class Datastore(object):
             parent = Datastore.process_operand(operand.parent)
             operator_str = Datastore.get_datastore_operation(operand.operator,
                                                              operand.operand)
-            operand_val = Datastore.process_operand(operand.operand) or 'null'
+            operand_val = ('null' if operand.operand is None else
+                           Datastore.process_operand(operand.operand))
             if operand.operator == operator.__contains__:
-                if isinstance(operand, string_types):
-                    return operator_str % (parent, parent, operand_val)
-                else:
+                if isinstance(operand.operand, string_types):
                     return operator_str % (parent, operand_val, parent)
+                else:
+                    return operator_str % (parent, parent, operand_val)
             return operator_str % (parent, operand_val)
         elif isinstance(operand, bson.objectid.ObjectId):
             return '"%s"' % operand
@@ -95,44 +372,234 @@ class Datastore(object):
             return '["%s"]' % ', '.join([Datastore.process_operand(op)
                                          for op in operand])
         else:
-            print operand, type(operand)
             raise AttributeError('Unsupported type %s' % str(type(operand)))
 
+    @staticmethod
+    def get_field_name(operand):
+        '''Get field name if operand is a plain model field or None
+        '''
+        if isinstance(operand, Field):
+            return operand.name
+        return None
+
+    @staticmethod
+    def process_value(value):
+        '''Convert query value into value can be stored in BSON document
+        '''
+        if isinstance(value, datetime.datetime):
+            return value
+        elif isinstance(value, datetime.date):
+            return datetime.datetime(value.year, value.month, value.day)
+        elif isinstance(value, datetime.time):
+            return value.strftime('%H:%M:%S')
+        elif isinstance(value, (list, tuple)):
+            return [Datastore.process_value(item) for item in value]
+        return value
+
+    @staticmethod
+    def merge_and(first, second):
+        '''Make filter document matches both filter documents
+        '''
+        if not first:
+            return second
+        elif not second:
+            return first
+        elif not set(first) & set(second):
+            document = dict(first)
+            document.update(second)
+            return document
+        conditions = []
+        for document in (first, second):
+            if list(document.keys()) == ['$and']:
+                conditions.extend(document['$and'])
+            else:
+                conditions.append(document)
+        return {'$and': conditions}
+
+    @staticmethod
+    def compile_functor(functor):
+        '''Compile field functor into filter document. Comparisons of field
+        with value and contains are compiled into query operators, other
+        expressions like arithmetic or fields comparison are compiled into
+        $where JavaScript expression, that can't use indexes.
+
+        Returns:
+            dictionary with MongoDB filter document
+        '''
+        operation = functor.operator
+        if operation in LOGICAL_OPERATORS:
+            first = Datastore.compile_operand(functor.parent)
+            second = Datastore.compile_operand(functor.operand)
+            if operation == operator.__and__:
+                return Datastore.merge_and(first, second)
+            elif operation == operator.__or__:
+                return {'$or': [first, second]}
+            return {'$or': [{'$and': [first, {'$nor': [second]}]},
+                            {'$and': [{'$nor': [first]}, second]}]}
+        name = Datastore.get_field_name(functor.parent)
+        if name is not None and not isinstance(functor.operand, BaseField):
+            value = Datastore.process_value(functor.operand)
+            if operation == operator.__eq__:
+                return {name: value}
+            elif operation in COMPARISON_OPERATORS:
+                return {name: {COMPARISON_OPERATORS[operation]: value}}
+            elif operation == operator.__contains__:
+                if isinstance(value, string_types):
+                    return {name: {'$regex': re.escape(value),
+                                   '$options': 'i'}}
+                return {name: value}
+        return {'$where': Datastore.process_operand(functor)}
+
+    @staticmethod
+    def compile_operand(operand):
+        '''Compile query operand: field functor or another query
+
+        Returns:
+            dictionary with MongoDB filter document
+        '''
+        if isinstance(operand, FieldFunctor):
+            return Datastore.compile_functor(operand)
+        elif isinstance(operand, Query):
+            return Datastore.build_query(operand)[0]
+        raise AttributeError('Unsupported query operand %s' % str(operand))
+
     @staticmethod
     def build_query(query):
-        operation = Datastore.get_datastore_operation(query.operation)
-        operand = Datastore.process_operand(query.operand)
+        '''Build filter document for query
+
+        Returns:
+            tuple (filter document, distinct, order)
+        '''
         if query._from_query is None:
-            source_query, distinct, order = '', query.dist, query.order
+            document, distinct, order = {}, query.dist, query.order
         else:
-            source_query, distinct, order = Datastore.build_query(
+            document, distinct, order = Datastore.build_query(
                                                             query._from_query)
             if query.order:
                 order = order and order + query.order or query.order
-        if not source_query:
-            if operation == operator.__not__:
-                return (Datastore.get_datastore_operation(query.operation) %
-                        Datastore.process_operand(query.operand),
-                        distinct, order)
+        operand = (Datastore.compile_operand(query.operand)
+                   if query.operand is not None else {})
+        if query.operation == operator.__not__:
+            return ({'$nor': [Datastore.merge_and(document, operand)]},
+                    distinct, order)
+        elif (query.operation == operator.__or__ and
+                query._from_query is not None and
+                (not document or query.operand is not None and not operand)):
+            # Union with all the items selects all the items
+            return {}, distinct, order
+        elif not document:
             return operand, distinct, order
-        return (operation % (source_query, operand), distinct, order)
+        elif not operand:
+            return document, distinct, order
+        elif query.operation == operator.__or__:
+            return {'$or': [document, operand]}, distinct, order
+        return Datastore.merge_and(document, operand), distinct, order
+
+    @staticmethod
+    def check_indexes(model, document):
+        '''Warn once for each model field used in filter without index. Each
+        filter shape is checked only once for the model
+        '''
+        if '$where' in document:
+            Datastore.warn_unindexed(model, '$where')
+        if not model._unindexed_properties:
+            return
+        shape = (model.entity_name(), get_filter_shape(document))
+        if shape in checked_filters:
+            return
+        checked_filters.add(shape)
+        for field in get_filter_fields(document) & model._unindexed_properties:
+            Datastore.warn_unindexed(model, field)
+
+    @staticmethod
+    def warn_unindexed(model, field):
+        '''Warn about query on model field without index if not warned yet
+        '''
+        key = (model.entity_name(), field)
+        if key not in unindexed_warnings:
+            unindexed_warnings.add(key)
+            warnings.warn('Query on %s.%s can not use index' % key,
+                          RuntimeWarning)
+
+    def get_indexes(self, model):
+        '''Get indexes exist in model collection
+
+        Returns:
+            dictionary maps index name to tuple (keys, unique)
+        '''
+        info = self.db[model.entity_name()].index_information()
+        return dict([(name, (tuple([(key, int(order)) for key, order
+                                    in index['key']]),
+                             bool(index.get('unique'))))
+                     for name, index in info.items()])
+
+    def create_index(self, model, index):
+        '''Create index in background
+
+        Returns:
+            index name
+        '''
+        return self.db[model.entity_name()].create_index(
+                list(index.keys), unique=index.unique, background=True)
+
+    def sync_indexes(self, model):
+        '''Create model indexes that are not exist in collection
+
+        Returns:
+            tuple (list of created indexes, list of declared indexes exist
+            in collection with different unique option)
+        '''
+        existing = dict(self.get_indexes(model).values())
+        created, mismatched = [], []
+        for index in model.indexes():
+            if index.keys not in existing:
+                self.create_index(model, index)
+                created.append(index)
+            elif existing[index.keys] != index.unique:
+                mismatched.append(index)
+        return created, mismatched
 
     def query(self, query, fields=None):
-        items = (fields is None and self.db[query.model.entity_name()].find()
-                 or self.db[query.model.entity_name()].find({},
-                            dict([(field_name, 1) for field_name in fields])))
-        query_string, distinct, order = Datastore.build_query(query)
-        if query_string:
-            items = items.where(query_string)
+        '''Get query results ordered by query order fields and key. Query
+        offset and limit are applied on server
+        '''
+        if query.limit is not None and query.limit <= 0:
+            return []
+        document, distinct, order = Datastore.build_query(query)
+        if check_unindexed:
+            Datastore.check_indexes(query.model, document)
+        collection = self.db[query.model.entity_name()]
+        items = (collection.find(document) if fields is None
+                 else collection.find(document, dict([(field_name, 1)
+                                               for field_name in fields])))
         items = distinct and items.distinct('_id') or items
-        return (items.sort([(f.name, 1) for f in order]) if order
-                else items.sort('_id', 1))
+        sort = [(field.name, 1) for field in order or ()]
+        if '_id' not in [name for name, _ in sort]:
+            # Key makes the order stable for pagination
+            sort.append(('_id', 1))
+        items = items.sort(sort)
+        if query.offset:
+            items = items.skip(query.offset)
+        return items.limit(query.limit) if query.limit else items
 
     def count(self, query):
-        return self.query(query).count()
+        '''Count query results on server
+        '''
+        if query.limit is not None and query.limit <= 0:
+            return 0
+        document = Datastore.build_query(query)[0]
+        collection = self.db[query.model.entity_name()]
+        options = {}
+        if query.offset:
+            options['skip'] = query.offset
+        if query.limit:
+            options['limit'] = query.limit
+        if hasattr(collection, 'count_documents'):
+            return collection.count_documents(document, **options)
+        return collection.find(document, **options).count(True)
 
     def slice(self, query, limit=1, offset=0):
-        return self.query(query).skip(offset).limit(limit)
+        return self.query(query[offset:offset + limit])
 
 
 class DatastoreManager(object):
@@ -168,9 +635,12 @@ class DatastoreManager(object):
         '''
         if not second_name:
             second_name = self.default_name
-        db = self.datastores[first_name].db
-        self.datastores[first_name].db = self.datastores[second_name].db
-        self.datastores[second_name].db = db
+        first = self.datastores[first_name]
+        second = self.datastores[second_name]
+        for attr in ('db_name', 'options', 'pid', '_db'):
+            value = getattr(first, attr)
+            setattr(first, attr, getattr(second, attr))
+            setattr(second, attr, value)
 
 
 manager = DatastoreManager()
@@ -0,0 +1,31 @@
+'''Commands to manage databases
+'''
+
+
+def sync_indexes(settings):
+    '''Create indexes declared in models of all the applications that are not
+    exist in database yet. Indexes are created in background. Declared
+    indexes exist with different unique option are reported and should be
+    rebuilt manually. Only models with fields declared in applications models
+    modules are synchronized, models declared anywhere else like tests and
+    base classes without fields don't have collections
+    '''
+    from ..utils import print_func
+    from .models import registry
+    modules = set()
+    for app in settings.section_options('APPS'):
+        try:
+            __import__(app + '.models', globals(), locals(), 'models')
+        except ImportError:
+            continue
+        modules.add(app + '.models')
+    for model in registry:
+        if model.__module__ not in modules or not model._fields:
+            continue
+        created, mismatched = model.datastore().sync_indexes(model)
+        for index in created:
+            print_func('Created index %s for %s' % (index,
+                                                    model.entity_name()))
+        for index in mismatched:
+            print_func('Index %s for %s exists with different unique option' %
+                       (index, model.entity_name()))
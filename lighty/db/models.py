@@ -12,6 +12,62 @@ def get_attr_source(name, cls):
             return src_cls
 
 
+class Index(object):
+    '''Database index declaration. Index can be declared for a number of model
+    fields, field name prefixed with '-' means descending order::
+
+        class Message(models.Model):
+            sender = fields.CharField()
+            created = fields.DateTimeField()
+            _indexes = (models.Index('sender', '-created'), )
+
+    Tuples of field names and single names can be used for non unique indexes
+    instead of Index instances.
+    '''
+    __slots__ = ('keys', 'unique', )
+
+    def __init__(self, *fields, **options):
+        '''Create index declaration
+
+        Args:
+            fields - field names
+            unique - is index unique
+        '''
+        super(Index, self).__init__()
+        self.keys = tuple([(field[1:], -1) if field.startswith('-')
+                           else (field, 1) for field in fields])
+        self.unique = options.get('unique', False)
+
+    def __repr__(self):
+        return '<Index: %s%s>' % (', '.join(['%s%s' % ('-' if order < 0
+                                                       else '', name)
+                                             for name, order in self.keys]),
+                                  ' unique' if self.unique else '')
+
+
+def get_index(declaration, fields, model_name):
+    '''Get index from declaration and check are all index fields in model
+
+    Returns:
+        Index instance
+    '''
+    if isinstance(declaration, Index):
+        index = declaration
+    elif isinstance(declaration, (list, tuple)):
+        index = Index(*declaration)
+    else:
+        index = Index(declaration)
+    for name, _ in index.keys:
+        if name not in fields and name != '_id':
+            raise AttributeError('Index field %s is not in model %s' % (
+                                 name, model_name))
+    return index
+
+
+registry = []
+'''All the model classes created'''
+
+
 class ModelBase(type):
     """Metaclass used to ORM class generation from definitions
     """
@@ -65,13 +121,27 @@ class ModelBase(type):
 
         new_attrs['_fields'] = defined
 
+        # Initialize indexes
+        declared = attrs.get('_indexes', getattr(parents[0], '_indexes', ()))
+        indexes = [get_index(index, defined, name) for index in declared]
+        indexes.extend([Index(field, unique=new_attrs[field].primary_key or
+                                            new_attrs[field].unique)
+                        for field in sorted(defined)
+                        if (new_attrs[field].primary_key or
+                            new_attrs[field].unique or
+                            new_attrs[field].db_index)])
+        new_attrs['_db_indexes'] = indexes
+
         # Initialize properties
+        indexed = set([index.keys[0][0] for index in indexes])
         new_attrs['_unindexed_properties'] = frozenset(
             new_attrs[field].name for field in new_attrs['_fields']
-            if not (new_attrs[field].primary_key or new_attrs[field].db_index))
+            if new_attrs[field].name not in indexed)
 
         # Create class instance
-        return super_new(cls, name, bases, new_attrs)
+        model = super_new(cls, name, bases, new_attrs)
+        registry.append(model)
+        return model
 
 
 class Model(with_metaclass(ModelBase)):
@@ -89,6 +159,8 @@ class Model(with_metaclass(ModelBase)):
     """
     _datastore_name = 'default'
     '''Name of datastore where t put the values'''
+    _indexes = ()
+    '''Compound indexes declarations'''
 
     def __init__(self, is_new=True, **kwds):
         """Creates a new instance of this model.
@@ -151,6 +223,18 @@ class Model(with_metaclass(ModelBase)):
             return self.__dict__[self._key_name]
         raise AttributeError('Key is not set for entity')
 
+    def get_datastore_values(self):
+        """Get dictionary of values prepared for saving in datastore
+        """
+        cls_dict = self.__class__.__dict__
+        fields = dict([(field_name,
+                        cls_dict[field_name].get_value_for_datastore(self))
+                       for field_name in self._fields
+                       if self._is_saved or cls_dict[field_name].editable])
+        if self._is_saved:
+            fields[self._key_name] = self.key()
+        return fields
+
     def put(self):
         """Writes this model instance to the datastore.
 
@@ -160,19 +244,38 @@ class Model(with_metaclass(ModelBase)):
         Returns:
             The key of the instance (either the existing key or a new key).
         """
-        cls_dict = self.__class__.__dict__
-        fields = dict([(field_name,
-                        cls_dict[field_name].get_value_for_datastore(self))
-                       for field_name in self._fields
-                       if self._is_saved or cls_dict[field_name].editable])
-        if self._is_saved:
-            fields[self._key_name] = self.key()
         setattr(self, self._key_name,
-                self.datastore.put(self.__class__, fields))
+                self.datastore.put(self.__class__,
+                                   self.get_datastore_values()))
         self._is_saved = True
         return self
     save = put
 
+    @classmethod
+    def put_many(cls, instances, batch_size=1000, ordered=True):
+        """Writes a number of model instances to the datastore with bulk
+        operations. New instances are inserted and saved ones are replaced:
+
+            User.put_many([User(name=name, age=18) for name in names])
+
+        Args:
+            instances: list of model instances
+            batch_size: number of instances sent to datastore at once
+            ordered: stop on first error, otherwise datastore tries to write
+                all the instances and reports errors after
+
+        Returns:
+            list of instances
+        """
+        instances = list(instances)
+        keys = cls.datastore().put_many(cls, [instance.get_datastore_values()
+                                              for instance in instances],
+                                        batch_size, ordered)
+        for instance, key in zip(instances, keys):
+            setattr(instance, cls._key_name, key)
+            instance._is_saved = True
+        return instances
+
     def delete(self):
         """Deletes this entity from the datastore
         """
@@ -238,6 +341,13 @@ class Model(with_metaclass(ModelBase)):
         """
         return query.Query(model=cls)
 
+    @classmethod
+    def indexes(cls):
+        '''Get list of indexes declared for model with _indexes attribute and
+        fields options: db_index, unique and primary_key
+        '''
+        return cls._db_indexes
+
     @classmethod
     def fields(cls):
         """Get fields list
@@ -1,17 +1,15 @@
-import collections
 import operator
+import sys
 
 from .. import monads
+from ..utils import collections_abc
 from .fields import Field
 
 
-class Query(collections.Iterable):
+class Query(collections_abc.Iterable):
     '''Query class
     '''
-    __slots__ = ('__add__', '__and__', '__call__', '__init__', '__iter__',
-                 '__getslice__', '__len__', '__neg__', '__not__', '__or__',
-                 'distinct', 'include', 'exclude', 'fetch', 'from_query',
-                 'values', '_cache', 'dist', '_from_query', 'limit', 'model',
+    __slots__ = ('_cache', 'dist', '_from_query', 'limit', 'model',
                  'operation', 'operand', 'order', 'offset', )
 
     def __init__(self, operand=None, operation=operator.__and__,
@@ -35,10 +33,10 @@ class Query(collections.Iterable):
                 self.offset += from_query.offset
             if from_query.limit:
                 self.limit = from_query.limit
-        elif operand is not None:
-            self.model = operand.model
         elif model is not None:
             self.model = model
+        elif operand is not None:
+            self.model = operand.model
         else:
             raise AttributeError('Query requires model to be specified')
 
@@ -64,16 +62,18 @@ class Query(collections.Iterable):
         return Query(operation=operator.__not__, from_query=self)
 
     def __sub__(self, operand):
-        '''Creates new query from this query with operation AND and specified
+        '''Creates new query from this query excludes items matches specified
         operand:
 
-            Query(ModelClass.field > 10) & Query(ModelClass.field < 20)
+            Query(ModelClass.field > 10) - (ModelClass.field == 15)
 
         equivalent to:
 
-            SELECT * FROM modelclass WHERE field > 10 AND field < 20
+            SELECT * FROM modelclass WHERE field > 10 AND NOT (field = 15)
         '''
-        return Query(operand=Query(operator.__not__, operand),
+        return Query(operand=Query(operand=operand,
+                                   operation=operator.__not__,
+                                   model=self.model),
                      operation=operator.__and__, from_query=self)
     exclude = __sub__
 
@@ -149,32 +149,148 @@ class Query(collections.Iterable):
         '''
         return [item for item in self.model.datastore().query(self, fields)]
 
+    def update(self, **values):
+        '''Set field values for all the items selected by query with one
+        datastore request:
+
+            >>> User.all().where(User.age < 18).update(age=18)
+            UPDATE user SET age = 18 WHERE age < 18
+
+        Returns:
+            number of items matched by query
+        '''
+        for name in values:
+            if name not in self.model._fields:
+                raise AttributeError('%s is not a field of model %s' % (
+                                     name, self.model.__name__))
+        return self.model.datastore().update_many(self, values)
+
+    def delete(self):
+        '''Delete all the items selected by query with one datastore request:
+
+            >>> User.all().where(User.age < 18).delete()
+            DELETE FROM user WHERE age < 18
+
+        Returns:
+            number of deleted items
+        '''
+        return self.model.datastore().delete_many(self)
+
     def __iter__(self):
         '''Returns and iterator throuch data from datastore
         '''
-        if self._cache:
+        if self._cache is not None:
             for item in self._cache:
                 yield item
+            return
         for item in self.model.datastore().query(self):
             yield self.model(is_new=False, **item)
 
     def __len__(self):
         '''Get number of items in query
         '''
-        return (len(self._cache) if self._cache
+        return (len(self._cache) if self._cache is not None
                 else self.model.datastore().count(self))
 
+    def copy(self):
+        '''Get query copy with the same ordering, offset and limit
+        '''
+        query = self()
+        query.dist = self.dist
+        query.order = self.order
+        query.offset = self.offset
+        query.limit = self.limit
+        return query
+
     def __getslice__(self, i=0, j=None):
         '''Get the query that contains a slice of current query
         '''
-        return Query(from_query=self._from_query, model=self.model,
-                     offset=i, limit=j)
+        return self.__getitem__(slice(i, None if j == sys.maxsize else j))
 
     def __getitem__(self, index):
-        '''Get item with specified number
+        '''Get item with specified number or the query that contains a slice
+        of current query. Slice is selected on server with skip and limit:
+
+            >>> User.all().order_by(User.age)[20:30]
+            SELECT * FROM user ORDER BY age LIMIT 10 OFFSET 20
         '''
-        if len(self) > index:
-            self.fetch(cache=True)
-            return self._cache[index]
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                raise ValueError('Query slice step is not supported')
+            start, stop = index.start or 0, index.stop
+            if start < 0 or (stop is not None and stop < 0):
+                raise IndexError('Negative indexes are not supported')
+            query = self.copy()
+            query._cache = (self._cache[index] if self._cache is not None
+                            else None)
+            query.offset = self.offset + start
+            if stop is not None:
+                query.limit = max(stop - start, 0)
+            if self.limit is not None:
+                limit = max(self.limit - start, 0)
+                query.limit = (limit if query.limit is None
+                               else min(query.limit, limit))
+            return query
+        if self._cache is not None:
+            if 0 <= index < len(self._cache):
+                return self._cache[index]
+        elif index >= 0:
+            for item in self[index:index + 1]:
+                return item
         return monads.NoneMonad('Not enought results in query to get item '
                                 'with index: %d' % index)
+
+    def after(self, item):
+        '''Get the query selects items following the item in query order.
+        Unlike slicing it does not skip items on server, so it works fast for
+        deep pages when ordering fields are indexed. Items with the same
+        ordering fields values are ordered by key. Offset and limit of this
+        query are not used.
+
+            >>> User.all().order_by(User.age).after(user)
+            SELECT * FROM user WHERE age > user.age OR
+                                     (age = user.age AND _id > user._id)
+        '''
+        key = Field()
+        key.configure(self.model.__name__, self.model._key_name)
+        order = self.model.datastore().build_query(self)[2] or ()
+        fields = []
+        for field in order:
+            if field.name not in [known.name for known in fields + [key]]:
+                fields.append(field)
+        fields.append(key)
+        condition = None
+        for num, field in enumerate(fields):
+            part = field > getattr(item, field.name)
+            for previous in fields[:num]:
+                part = part & (previous == getattr(item, previous.name))
+            condition = part if condition is None else condition | part
+        query = self.where(condition)
+        query.offset = 0
+        query.limit = None
+        return query
+
+    def pages(self, size):
+        '''Iterate over query results by pages. Each next page is selected
+        after the last item of previous page with after(), so iteration over
+        large collections does not skip many items on server. Offset and limit
+        of sliced query are respected
+
+        Args:
+            size - number of items in page
+
+        Returns:
+            generator yields lists of model instances
+        '''
+        remaining = self.limit
+        # list() would request count of items to get length hint
+        page = [item for item in self[:size]]
+        while page:
+            yield page
+            if remaining is not None:
+                remaining -= len(page)
+            if len(page) < size or remaining == 0:
+                break
+            query = self.after(page[-1])[:size if remaining is None
+                                         else min(size, remaining)]
+            page = [item for item in query]
@@ -35,7 +35,8 @@ class FunctorBase(type):
             if hasattr(parent, '_lazy'):
                 new_attrs['_lazy'] |= set(parent._lazy)
         for attr in new_attrs['_lazy']:
-            attrs[attr.__name__] = create_operator(attr)
+            # Python 3 operator functions are named without underscores
+            attrs['__%s__' % attr.__name__.strip('_')] = create_operator(attr)
         new_attrs.update(attrs)
         return super_new(mcs, name, bases, new_attrs)
 
@@ -102,8 +102,7 @@ class ValueMonad(functor.BaseFunctor):
     '''Base monad class. All the operations except comparisions and few others
     returns monads.
     '''
-    __slots__ = ('__init__', '__getitem__', '__delitem__', '__setitem__',
-                 '__iter__', '__len__', '__call__', '__str__', 'value', )
+    __slots__ = ('value', )
     _lazy = (operator.__lt__, operator.__le__, operator.__eq__,
              operator.__ge__, operator.__gt__, operator.__add__,
              operator.__sub__, operator.__mod__, operator.__pow__,
@@ -167,6 +166,8 @@ class ValueMonad(functor.BaseFunctor):
 
     def __index__(self):
         return self.value if hasattr(self.value, '__index__') else None
+# Module level __getattr__ is used for module attributes access in python 3.7
+del __getattr__
 
 
 class NoneMonad(ValueMonad):
@@ -107,3 +107,7 @@ class SignalDispatcher(object):
                     num += 1
         else:
             del self.channels[key]
+
+
+dispatcher = SignalDispatcher()
+'''Default signals dispatcher'''
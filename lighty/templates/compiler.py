@@ -0,0 +1,175 @@
+"""Module provides template compiler. Compiler converts list of template
+commands into python source code of single render function and compiles it.
+
+Template command list looks like::
+
+    [print_constant, print_variable, execute_tag, print_constant]
+
+and for this list compiler generates something like::
+
+    def render(context):
+        return ''.join((
+            '<h1>',
+            str(get_value('title', context)),
+            command_2(context),
+            '</h1>',
+        ))
+
+Constants are inlined into generated code as string literals, variables are
+resolved with straight-line code without splitting variable name on each call,
+and all other commands (tags, filters, inner templates) are called as plain
+functions. So template rendering becomes just one python function call with
+single join instead of a loop over all the commands.
+"""
+from .context import get_field, get_value
+
+RENDER_NAME = 'render'
+
+
+def compile_variable(name):
+    '''Generate code to access a variable with name specified. Dotted variable
+    names are converted into nested get_field() calls.
+
+    Args:
+        name - variable name, e.g. 'user.name'
+
+    Returns:
+        string contains python expression
+    '''
+    fields = name.split('.')
+    code = '_get_value(%r, context)' % fields[0]
+    for field in fields[1:]:
+        code = '_get_field(%s, %r)' % (code, field)
+    return code
+
+
+def optimize(commands):
+    '''Optimize commands list before compilation:
+
+    - inline commands of inner templates (e.g. blocks)
+    - drop empty constants (e.g. results of non-lazy tags)
+    - merge adjacent constants into single constant
+
+    Args:
+        commands - list of template commands
+
+    Returns:
+        new list of commands
+    '''
+    result = []
+    text = []
+    for command in commands:
+        if getattr(command, 'inline', False):
+            inner = optimize(command.commands)
+        else:
+            inner = (command, )
+        for cmd in inner:
+            if hasattr(cmd, 'constant_value'):
+                text.append(cmd.constant_value)
+                continue
+            if len(''.join(text)) > 0:
+                result.append(make_constant(''.join(text)))
+            text = []
+            result.append(cmd)
+    if len(''.join(text)) > 0:
+        result.append(make_constant(''.join(text)))
+    return result
+
+
+def make_constant(value):
+    '''Create command returns constant value
+    '''
+    def print_constant(context):
+        return value
+    print_constant.constant_value = value
+    return print_constant
+
+
+def generate_source(commands, namespace):
+    '''Generate python source code for list of commands
+
+    Args:
+        commands - list of template commands
+        namespace - dictionary to put the objects used in generated code
+
+    Returns:
+        string contains source code of render function
+    '''
+    lines = []
+    for index, command in enumerate(commands):
+        if hasattr(command, 'constant_value'):
+            lines.append(repr(command.constant_value))
+        elif hasattr(command, 'variable_name'):
+            lines.append('str(%s)' % compile_variable(command.variable_name))
+        else:
+            command_name = '_command_%d' % index
+            namespace[command_name] = command
+            lines.append('%s(context)' % command_name)
+    return 'def %s(context):\n    return "".join((\n%s    ))\n' % (
+                RENDER_NAME, ''.join(['        %s,\n' % line
+                                      for line in lines]))
+
+
+def stream_commands(commands, context):
+    '''Execute commands one by one and yield the results. Commands that have
+    stream attribute (inner templates, blocks and tags) are streamed too.
+
+    Args:
+        commands - list of template commands
+        context - context to execute commands on
+
+    Returns:
+        generator yields strings
+    '''
+    for command in commands:
+        if hasattr(command, 'stream'):
+            for chunk in command.stream(context):
+                yield chunk
+        else:
+            yield command(context)
+
+
+def compile_commands(commands, name='unnamed'):
+    '''Compile list of commands into single render function
+
+    Args:
+        commands - list of template commands
+        name - template name used in the file name of the generated code
+
+    Returns:
+        function that accepts context and returns string
+    '''
+    namespace = {'_get_field': get_field, '_get_value': get_value}
+    source = generate_source(optimize(commands), namespace)
+    code = compile(source, '<template: %s>' % name, 'exec')
+    exec(code, namespace)
+    render = namespace[RENDER_NAME]
+    render.source = source
+    return render
+
+
+class Block(list):
+    '''List of commands for block tags. Block compiles commands into render
+    function on first call and can be executed like a template::
+
+        block = Block([Template.constant('Hello, '),
+                       Template.variable('name')])
+        block({'name': 'world'})  # returns 'Hello, world'
+    '''
+    __slots__ = ('render', )
+
+    def __init__(self, commands=()):
+        super(Block, self).__init__(commands)
+        self.render = None
+
+    def __call__(self, context):
+        '''Execute block commands on a context specified
+        '''
+        if self.render is None:
+            self.render = compile_commands(self, 'block')
+        return self.render(context)
+
+    def stream(self, context):
+        '''Execute block commands one by one and yield the results
+        '''
+        return stream_commands(self, context)
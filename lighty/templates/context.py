@@ -1,22 +1,168 @@
 '''Methods for context accessing
+
+Variable names like 'user.profile.name' are compiled into resolver functions
+once and cached, so dotted name is not splitted on each template execution.
+Also get_field() remembers which way to access the field (attribute or item)
+worked for class of object and uses it for all the objects of the same class.
 '''
-from functools import reduce
+ATTRIBUTE = 1
+ITEM = 2
+
+access_cache = {}
+'''Cache contains access types for pairs (class, field name)'''
+resolvers = {}
+'''Cache contains compiled resolvers for variable names'''
+MISSING = object()
+'''Marker for variables that was not set in context'''
+
+
+class ContextStack(dict):
+    '''Layered context used on template execution. Block tags push the
+    layer with own variables on top of the stack and pop it after block
+    execution, so user's context is never changed and could be shared
+    between threads::
+
+        stack = ContextStack({'a': 1, 'b': 2})
+        stack.push({'b': 3})
+        stack['a']  # 1
+        stack['b']  # 3
+        stack.pop()
+        stack['b']  # 2
+
+    Variables from all the pushed layers are kept in the stack itself, so
+    lookups are plain dict lookups and only missed variables are looked for
+    in the base context. Values shadowed by the layer are saved on push and
+    restored on pop. Variable set after push is restored on pop too, so it's
+    visible only until the top layer is removed. Keys, values and items
+    include variables from base context.
+    '''
+    __slots__ = ('base', 'saved', )
+
+    def __init__(self, base=None):
+        super(ContextStack, self).__init__()
+        self.base = {} if base is None else base
+        self.saved = []
+
+    def __missing__(self, name):
+        return self.base[name]
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.base
+
+    def __setitem__(self, name, value):
+        if self.saved and name not in self.saved[-1]:
+            self.saved[-1][name] = dict.get(self, name, MISSING)
+        dict.__setitem__(self, name, value)
+
+    def __iter__(self):
+        for name in dict.__iter__(self):
+            yield name
+        for name in self.base:
+            if not dict.__contains__(self, name):
+                yield name
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return list(self.__iter__())
+
+    def values(self):
+        return [self[name] for name in self.__iter__()]
+
+    def items(self):
+        return [(name, self[name]) for name in self.__iter__()]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def push(self, values):
+        '''Push new layer with values specified on top of the stack
+        '''
+        saved = dict([(name, dict.get(self, name, MISSING))
+                      for name in values])
+        dict.update(self, values)
+        self.saved.append(saved)
+
+    def pop(self):
+        '''Remove top layer and restore the variables it shadowed or set
+        '''
+        for name, value in self.saved.pop().items():
+            if value is MISSING:
+                dict.__delitem__(self, name)
+            else:
+                dict.__setitem__(self, name, value)
+
+
+def get_stack(context):
+    '''Get context stack for context specified. Context stack is returned as
+    is and for any other context new stack is created.
+    '''
+    return context if isinstance(context, ContextStack) else ContextStack(
+                                                                    context)
 
 
 def get_value(var_name, context):
-    return context[var_name] if var_name in context else None
+    try:
+        return context[var_name]
+    except KeyError:
+        return None
 
 
 def get_field(obj, field):
+    cls = obj.__class__
+    access = access_cache.get((cls, field))
+    if access == ITEM:
+        return obj[field]
+    elif access == ATTRIBUTE:
+        try:
+            return getattr(obj, field)
+        except AttributeError:
+            pass
     if hasattr(obj, field):
+        access_cache[(cls, field)] = ATTRIBUTE
         return getattr(obj, field)
     elif hasattr(obj, '__getitem__') and hasattr(obj, '__contains__'):
+        # Objects without __dict__ (like dict or list) can't have attributes
+        # that class does not have, so it's safe to cache an access type.
+        # Slots are declared in class, but could be not set for the object
+        if not hasattr(obj, '__dict__') and not hasattr(cls, field):
+            access_cache[(cls, field)] = ITEM
         return obj[field]
     raise Exception('Could not get %s from %s' % (field, obj))
 
 
+def compile_resolver(var_name):
+    '''Create function that resolves variable with name specified
+
+    Args:
+        var_name - variable name, e.g. 'user.name'
+
+    Returns:
+        function that accepts context and returns variable value
+    '''
+    fields = var_name.split('.')
+    name = fields[0]
+    path = tuple(fields[1:])
+
+    def resolve_variable(context):
+        try:
+            value = context[name]
+        except KeyError:
+            value = None
+        for field in path:
+            value = get_field(value, field)
+        return value
+    return resolve_variable
+
+
+def get_resolver(var_name):
+    '''Get compiled resolver for variable name from cache or compile new one
+    '''
+    if var_name not in resolvers:
+        resolvers[var_name] = compile_resolver(var_name)
+    return resolvers[var_name]
+
+
 def resolve(var_name, context):
-    if '.' in var_name:
-        fields = var_name.split('.')
-        return reduce(get_field, [get_value(fields[0], context)] + fields[1:])
-    return get_value(var_name, context)
+    return get_resolver(var_name)(context)
@@ -1,19 +1,18 @@
 """Package provides template filters management
 """
-import string
-from .context import resolve
 
 
 class FilterManager(object):
     """Class used for filters manipulations
     """
-    __slots__ = ('apply', 'filters', 'is_filter_exists', )
+    __slots__ = ('filters', 'volatile', )
 
     def __init__(self):
         """Create new tag managet instance
         """
         super(FilterManager, self).__init__()
         self.filters = {}
+        self.volatile = set()
 
     def is_filter_exists(self, name):
         """Check is filter exists
@@ -22,20 +21,26 @@ class FilterManager(object):
             raise Exception("Filter '%s' is not registered" % name)
         return self.filters[name]
 
-    def register(self, filter):
+    def is_volatile(self, name):
+        """Check is filter result can differs for the same arguments. Such
+        filters are never evaluated on template parsing
+        """
+        self.is_filter_exists(name)
+        return name in self.volatile
+
+    def register(self, filter, is_volatile=False):
         '''Register filter in manager
+
+        Args:
+            filter - filter function
+            is_volatile - set it to True if filter can return different
+                          results for the same arguments
         '''
         self.filters[filter.__name__] = filter
+        if is_volatile:
+            self.volatile.add(filter.__name__)
+        else:
+            self.volatile.discard(filter.__name__)
 
-    def apply(self, filter, value, args, arg_types, context):
-        '''Apply filter to values
-        '''
-        filter_func = self.is_filter_exists(filter)
-        new_args = []
-        i = 0
-        while i < len(args):
-            new_args.append(arg_types[i] and args[i] or context[args[i]])
-            i += 1
-        return filter_func(value, *new_args)
 
 filter_manager = FilterManager()
@@ -0,0 +1,67 @@
+"""Template lexer. Splits template text into the list of tokens using single
+compiled regular expression instead of iterating over all the characters.
+
+Each token is a tuple (type, value, line, column) where type is one of:
+
+- TEXT - plain text between template tags
+- ECHO - variable or variable with filters, e.g. {{ user.name|capfirst }}
+- TAG - template tag, e.g. {% for item in items %}
+
+Value for ECHO and TAG tokens is a stripped text between the brackets. Line
+and column are 1-based token position in template text.
+"""
+import re
+
+from ..utils import string_types
+
+TEXT = 1
+ECHO = 2
+TAG = 3
+
+TOKEN_PATTERN = re.compile(r'\{\{([^}]*)\}\}|\{%([^%]*)%\}|(\{[{%])')
+
+
+def tokenize(text):
+    '''Split template text into tokens
+
+    Args:
+        text - template text or iterable over the template characters or lines
+
+    Returns:
+        generator yields tuples (type, value, line, column)
+
+    Raises:
+        Exception - on unclosed or wrong closed tags
+    '''
+    if not isinstance(text, string_types):
+        text = ''.join(text)
+    line = 1
+    line_start = 0
+    position = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        start = match.start()
+        if start > position:
+            value = text[position:start]
+            yield (TEXT, value, line, position - line_start + 1)
+            newlines = value.count('\n')
+            if newlines > 0:
+                line += newlines
+                line_start = position + value.rindex('\n') + 1
+        column = start - line_start + 1
+        echo, tag, error = match.groups()
+        if error is not None:
+            raise Exception('Wrong template syntax: unclosed "%s" at line %d, '
+                            'column %d' % (error, line, column))
+        elif echo is not None:
+            yield (ECHO, echo.strip(), line, column)
+            value = echo
+        else:
+            yield (TAG, tag.strip(), line, column)
+            value = tag
+        newlines = value.count('\n')
+        if newlines > 0:
+            line += newlines
+            line_start = start + 2 + value.rindex('\n') + 1
+        position = match.end()
+    if position < len(text):
+        yield (TEXT, text[position:], line, position - line_start + 1)
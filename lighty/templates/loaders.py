@@ -1,8 +1,16 @@
 """Package provides template loaders
 """
-import itertools
+import hashlib
+import marshal
 import os
 import os.path
+import sys
+import tempfile
+
+from .lexer import tokenize
+
+CACHE_VERSION = 1
+'''Version of cached tokens format. Increase it on lexer changes'''
 
 
 class TemplateLoader(object):
@@ -28,17 +36,90 @@ class TemplateLoader(object):
             raise Exception("Template '%s' was not found" % name)
         return self.templates[name]
 
+    def get_tokens(self, name):
+        '''Get tokens list for template source with name specified
+        '''
+        raise Exception("There is no source for template '%s'" % name)
+
+
+class TemplateCache(object):
+    '''On-disk cache for tokenized templates. Each template file tokens are
+    stored with marshal in separate file inside cache directory. Cached tokens
+    are valid while template file path, modification time and size, cache
+    format version and python version are the same. So worker processes can
+    share one cache directory and load templates without tokenizing.
+    '''
+
+    def __init__(self, cache_dir):
+        '''Create new cache instance stores data in directory specified
+        '''
+        super(TemplateCache, self).__init__()
+        self.cache_dir = cache_dir
+        if not os.path.exists(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                pass
+
+    def get_path(self, file_path):
+        '''Get cache file path for template file path
+        '''
+        key = os.path.realpath(file_path).encode('utf-8')
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(key).hexdigest() + '.tokens')
+
+    @staticmethod
+    def get_key(file_path):
+        '''Get tuple used to check is cache entry valid for template file
+        '''
+        stat = os.stat(file_path)
+        return (CACHE_VERSION, tuple(sys.version_info[:2]),
+                os.path.realpath(file_path), stat.st_mtime, stat.st_size)
+
+    def load(self, file_path):
+        '''Load tokens for template file
+
+        Returns:
+            list of tokens or None if there is no valid cache entry
+        '''
+        try:
+            with open(self.get_path(file_path), 'rb') as file:
+                key, tokens = marshal.load(file)
+        except Exception:
+            return None
+        return tokens if key == self.get_key(file_path) else None
+
+    def store(self, file_path, tokens):
+        '''Store tokens for template file into cache. File written into
+        temporary file and then renamed to prevent reading partially written
+        data from another processes.
+        '''
+        try:
+            handle, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(handle, 'wb') as file:
+                marshal.dump((self.get_key(file_path), tokens), file)
+            os.rename(temp_path, self.get_path(file_path))
+        except (IOError, OSError):
+            pass
+
 
 class FSLoader(TemplateLoader):
-    '''Class provides methods for template managing
+    '''Class provides methods for template managing. Templates are registered
+    on loader creation but files are read and parsed only on first template
+    usage.
+
+    If cache_dir specified tokenized templates would be stored in this
+    directory and loaded from it on the next usage (see :class:TemplateCache).
     '''
 
-    def __init__(self, template_dirs):
+    def __init__(self, template_dirs, cache_dir=None):
         '''Create new FSLoader instance, retrieves all the templates from
         template dictionaries specified and register them
         '''
         from .template import LazyTemplate
         super(FSLoader, self).__init__()
+        self.paths = {}
+        self.cache = TemplateCache(cache_dir) if cache_dir else None
         for path in template_dirs:
             for root, dirs, files in os.walk(path):
                 if root.startswith(path):
@@ -50,7 +131,33 @@ class FSLoader(TemplateLoader):
                     relative_path = relative_path[1:]
                 for file_name in files:
                     name = os.path.join(relative_path, file_name)
-                    file_path = os.path.join(root, file_name)
-                    with open(file_path, 'r') as file:
-                        content = itertools.chain(*file.readlines())
-                        LazyTemplate(content, name=name, loader=self)
+                    self.paths[name] = os.path.join(root, file_name)
+                    LazyTemplate(name=name, loader=self)
+
+    def prepare(self):
+        '''Parse all the registered templates. Templates which could not be
+        parsed are left to be parsed on first usage
+        '''
+        from .template import LazyTemplate
+        for template in list(self.templates.values()):
+            if (isinstance(template, LazyTemplate) and
+                    'execute' not in template.__dict__):
+                try:
+                    template.prepare()
+                except Exception:
+                    pass
+
+    def get_tokens(self, name):
+        '''Get tokens for template from cache or read template file and
+        tokenize it
+        '''
+        if name not in self.paths:
+            return super(FSLoader, self).get_tokens(name)
+        file_path = self.paths[name]
+        tokens = self.cache.load(file_path) if self.cache else None
+        if tokens is None:
+            with open(file_path, 'r') as file:
+                tokens = list(tokenize(file.read()))
+            if self.cache:
+                self.cache.store(file_path, tokens)
+        return tokens
@@ -66,8 +66,12 @@ class TagManager(object):
 
     def register(self, name, tag, is_block_tag=False, context_required=False,
                  template_required=False, loader_required=False,
-                 is_lazy_tag=True):
+                 is_lazy_tag=True, stream=None):
         """Register new tag
+
+        Stream is an optional generator function accepts the same arguments as
+        tag function does and yields the tag result by parts. It's used for
+        streaming template rendering.
         """
         self.tags[name] = (
             tag,
@@ -75,7 +79,8 @@ class TagManager(object):
             context_required,
             template_required,
             loader_required,
-            is_lazy_tag
+            is_lazy_tag,
+            stream
         )
 
     def is_tag_exists(self, name):
@@ -97,10 +102,9 @@ class TagManager(object):
         """
         return self.is_tag_exists(name)[5]
 
-    def execute(self, name, token, context, block, template, loader):
-        """Execute tag
+    def get_args(self, tag, token, context, block, template, loader):
+        """Get the arguments required by tag
         """
-        tag = self.is_tag_exists(name)
         args = {'token': token}
         if tag[1]:
             args['block'] = block
@@ -110,6 +114,26 @@ class TagManager(object):
             args['template'] = template
         if tag[4]:
             args['loader'] = loader
-        return tag[0](**args)
+        return args
+
+    def execute(self, name, token, context, block, template, loader):
+        """Execute tag
+        """
+        tag = self.is_tag_exists(name)
+        return tag[0](**self.get_args(tag, token, context, block, template,
+                                      loader))
+
+    def stream(self, name, token, context, block, template, loader):
+        """Execute tag and yield the results by parts. If there is no stream
+        function registered for tag the whole tag result returned as single
+        part
+        """
+        tag = self.is_tag_exists(name)
+        args = self.get_args(tag, token, context, block, template, loader)
+        if tag[6] is None:
+            yield tag[0](**args)
+        else:
+            for chunk in tag[6](**args):
+                yield chunk
 
 tag_manager = TagManager()
@@ -4,12 +4,14 @@
 - LazyTemplate
 """
 from collections import deque
-from functools import reduce
 from decimal import Decimal
 from ..utils import StringIO
-from .context import resolve
+from .compiler import (Block, compile_commands, make_constant,
+                       stream_commands)
+from .context import get_resolver, get_stack
 from .loaders import TemplateLoader
 from .filter import filter_manager
+from .lexer import ECHO, TEXT, tokenize
 from .tag import tag_manager, parse_token
 
 
@@ -46,13 +48,8 @@ class Template(object):
         ...           'var': 'test'})
         'Hello, Peter from test'
     """
-    TEXT = 1
-    TOKEN = 2
-    ECHO = 3
-    FILTER = 4
-    TAG = 5
-    STRING = 6
-    CLOSE = 7
+    inline = True
+    '''Template commands can be inlined into parent template on compilation'''
 
     def __init__(self, text=None, loader=TemplateLoader(), name="unnamed"):
         """Create new template instance
@@ -62,6 +59,7 @@ class Template(object):
         self.name = name
         self.commands = []
         self.context = {}
+        self.render = None
         self.loader.register(name, self)
         if text is not None:
             self.parse(text)
@@ -69,62 +67,95 @@ class Template(object):
     def __eq__(self, obj):
         return type(self) == type(obj) and self.name == obj.name
 
+    def __getstate__(self):
+        '''Get template state for copying. Compiled render function is not
+        copied because it's bound to the commands of original template.
+        '''
+        state = self.__dict__.copy()
+        state['render'] = None
+        return state
+
     @staticmethod
     def variable(name):
+        resolve_variable = get_resolver(name)
+
         def print_variable(context):
-            return str(resolve(name, context))
+            return str(resolve_variable(context))
+        print_variable.variable_name = name
         return print_variable
 
     @staticmethod
     def constant(value):
-        def print_constant(context):
-            return value
-        return print_constant
+        return make_constant(value)
 
     @staticmethod
     def filter(value):
-        '''Parse the tamplte filter
+        '''Parse the tamplte filter. Filter functions are looked up and
+        constant arguments are prepared once on parsing, so only variable
+        resolving and filter functions calls left for template execution.
         '''
         parts = value.split('|')
+        variable = parts[0].strip()
         filters = []
-        variable = parts[0]
+        is_constant = True
         for token in parts[1:]:
-            if ':' in token:
-                parsed = token.split(':')
-                if len(parsed) > 1:
-                    filter, args_token = parsed
-                    args, types = parse_token(args_token)
-                else:
-                    filter = parsed
-                    args, types = (), ()
+            name, _, args_token = token.partition(':')
+            filter_func = filter_manager.is_filter_exists(name.strip())
+            args, types = parse_token(args_token) if args_token else ((), ())
+            variables = tuple([(arg, not arg_type)
+                               for arg, arg_type in zip(args, types)])
+            if not all(types):
+                filters.append((filter_func, None, variables))
+                is_constant = False
+            else:
+                filters.append((filter_func, tuple(args), None))
+            is_constant &= not filter_manager.is_volatile(name.strip())
+        # Get value getter
+        if variable[0] == '"' or variable[0] == "'":
+            if variable[0] != variable[-1] or len(variable) < 2:
+                raise Exception('Template filter syntax error')
+            constant = variable[1:-1]
+            get_value = lambda context: constant
+        else:
+            try:
+                constant = Decimal(variable)
+            except:
+                get_value = get_resolver(variable)
+                is_constant = False
             else:
-                filter = token
-                args, types = (), ()
-            filters.append((filter, args, types))
+                get_value = lambda context: constant
 
         def apply_filters(context):
-            def apply_filter(value, pair):
-                filter, args, types = pair
-                return filter_manager.apply(filter, value, args, types,
-                                            context)
-            if variable[0] == '"' or variable[0] == "'":
-                if variable[0] == variable[-1]:
-                    value_with_filters = [variable[1:-1]] + filters
-                else:
-                    raise Exception('Template filter syntax error')
-            else:
-                try:
-                    value_with_filters = [Decimal(variable)] + filters
-                except:
-                    value_with_filters = [resolve(variable, context)] + filters
-            return str(reduce(apply_filter, value_with_filters))
+            value = get_value(context)
+            for filter_func, args, variables in filters:
+                if variables is not None:
+                    args = [context[arg] if is_variable else arg
+                            for arg, is_variable in variables]
+                value = filter_func(value, *args)
+            return str(value)
+
+        # Evaluate filters applied to constant values with constant arguments
+        # on parsing
+        if is_constant:
+            try:
+                return Template.constant(apply_filters({}))
+            except Exception:
+                pass
         return apply_filters
 
     def tag(self, name, token, block):
         if tag_manager.is_lazy_tag(name):
+            if tag_manager.is_block_tag(name):
+                block = Block(block)
+
             def execute_tag(context):
                 return tag_manager.execute(name, token, context, block, self,
                                            self.loader)
+
+            def stream_tag(context):
+                return tag_manager.stream(name, token, context, block, self,
+                                          self.loader)
+            execute_tag.stream = stream_tag
             return execute_tag
         else:
             result = tag_manager.execute(name, token, self.context, block,
@@ -132,99 +163,77 @@ class Template(object):
             if callable(result):
                 return result
             else:
-                return lambda context: ''
+                return Template.constant('')
 
     def parse(self, text):
         """Parse template string and create appropriate command list into this
         template instance
         """
-        current = Template.TEXT
-        token = ''
+        self.parse_tokens(tokenize(text))
+
+    def parse_tokens(self, tokens):
+        """Create appropriate command list into this template instance from
+        the tokens list returned by :func:`lighty.templates.lexer.tokenize`
+        """
         cmds = self.commands
+        self.render = None
         cmd_stack = deque()
         tag_stack = deque()
         token_stack = deque()
-        for char in text:
-            if current == Template.TEXT:
-                if char == '{':
-                    current = Template.TOKEN
-                    if len(token) > 0:
-                        cmds.append(Template.constant(token))
-                        token = ''
-                else:
-                    token += str(char)
-            elif current == Template.TOKEN:
-                if char == '{':
-                    current = Template.ECHO
-                elif char == '%':
-                    current = Template.TAG
+        for token_type, token, line, column in tokens:
+            if token_type == TEXT:
+                cmds.append(Template.constant(token))
+            elif token_type == ECHO:
+                if len(token) > 0:
+                    cmds.append(Template.filter(token) if '|' in token
+                                else Template.variable(token))
+            else:
+                name = token.split(' ', 1)[0]
+                if name.startswith('end'):
+                    name = name[3:]
+                    if len(tag_stack) == 0:
+                        raise Exception("Unexpected closing tag 'end%s' at "
+                                        "line %d, column %d" %
+                                        (name, line, column))
+                    tag = tag_stack.pop()
+                    # Close block
+                    if name == tag:
+                        block = cmds
+                        cmds = cmd_stack.pop()
+                        token = token_stack.pop()
+                        cmds.append(self.tag(name, token, block))
+                    else:
+                        raise Exception(
+                            "Invalid closing tag: 'end%s' except 'end%s' at "
+                            "line %d, column %d" % (name, tag, line, column))
                 else:
-                    current = Template.TEXT
-                    token = '{' + str(char)
-            elif current == Template.ECHO or current == Template.FILTER:
-                if char == '}':
-                    if len(token) > 0:
-                        token = token.strip()
-                        if current == Template.ECHO:
-                            cmd = Template.variable(token)
-                        else:
-                            cmd = Template.filter(token)
-                        cmds.append(cmd)
+                    if ' ' in token:
+                        token = token.split(' ', 1)[1]
+                    else:
                         token = ''
-                    current = Template.CLOSE
-                elif char == '|':
-                    current = Template.FILTER
-                    token += str(char)
-                else:
-                    token += str(char)
-            elif current == Template.TAG:
-                if char == '%':
-                    current = Template.CLOSE
-                    token = token.strip()
-                    name = token.split(' ', 1)[0]
-                    if name.startswith('end'):
-                        name = name[3:]
-                        tag = tag_stack.pop()
-                        # Close block
-                        if name == tag:
-                            block = cmds
-                            cmds = cmd_stack.pop()
-                            token = token_stack.pop()
-                            cmds.append(self.tag(name, token, block))
-                        else:
-                            raise Exception(
-                                "Invalid closing tag: 'end%s' except 'end%s'" %
-                                (name, tag))
+                    if tag_manager.is_block_tag(name):
+                        cmd_stack.append(cmds)
+                        tag_stack.append(name)
+                        token_stack.append(token)
+                        cmds = []
                     else:
-                        if ' ' in token:
-                            token = token.split(' ', 1)[1]
-                        else:
-                            token = ''
-                        if tag_manager.is_block_tag(name):
-                            cmd_stack.append(cmds)
-                            tag_stack.append(name)
-                            token_stack.append(token)
-                            cmds = []
-                        else:
-                            cmds.append(self.tag(name, token, ()))
-                    token = ''
-                else:
-                    token += str(char)
-            elif current == Template.CLOSE:
-                if char == '}':
-                    current = Template.TEXT
-                else:
-                    raise Exception('Wrong template syntax')
-            else:
-                raise Exception('Wrong template syntax')
+                        cmds.append(self.tag(name, token, ()))
         # Check stack length - detect unclosed tags
         if len(cmd_stack) > 0:
             raise Exception('Unexpected end of input - not all tags closed')
-        # Last value
-        if len(token) > 0:
-            cmds.append(Template.constant(token))
         self.commands = cmds
 
+    def compile(self):
+        """Compile template commands into single python function. Template
+        compiles itself on first execution, so usually you don't need to call
+        this method directly.
+
+        Returns:
+            function that accepts context and returns the result string
+        """
+        self.render = compile_commands(self.commands, self.name)
+        return self.render
+
     def execute(self, context={}):
         """Execute all commands on a specified context
 
@@ -233,18 +242,30 @@ class Template(object):
         Returns:
             string contains the whole result
         """
-        result = StringIO()
-        for cmd in self.commands:
-            result.write(cmd(context))
-        value = result.getvalue()
-        result.close()
-        return value
+        render = self.render or self.compile()
+        return render(get_stack(context))
 
     def __call__(self, context={}):
         """Alias for execute()
         """
         return self.execute(context)
 
+    def stream(self, context={}):
+        """Execute commands one by one on a specified context and yield the
+        results. It can be used to send the response to client by parts
+        without waiting for the whole template rendering::
+
+            for chunk in template.stream({'items': items}):
+                output.write(chunk)
+
+        Arguments:
+            context: dict contains varibles
+        Returns:
+            generator yields strings
+        """
+        return stream_commands(self.commands, get_stack(context))
+    generate = stream
+
     def partial(self, context, name='', key_args=()):
         """Execute all commands on a specified context and cache the result as
         another template ready for execution
@@ -255,6 +276,7 @@ class Template(object):
             another template contains the result
         """
         result = Template(loader=self.loader, name=name)
+        context = get_stack(context)
         buffer = StringIO()
         for cmd in self.commands:
             try:
@@ -296,14 +318,22 @@ class LazyTemplate(Template):
     child template loaded before parent). Also it speed ups templates loading
     process because it does not require to parse all the templates when they
     even not used.
+
+    If there is no text specified template gets tokens from loader using
+    :func:`lighty.templates.loaders.TemplateLoader.get_tokens` on preparation.
     '''
+    inline = False
 
     def prepare(self):
         '''Prepare to execution
         '''
         self.parse = super(LazyTemplate, self).parse
-        self.parse(self.text)
-        del self.text
+        if hasattr(self, 'text'):
+            self.parse(self.text)
+            del self.text
+        else:
+            self.parse_tokens(self.loader.get_tokens(self.name))
+        self.stream = super(LazyTemplate, self).stream
         execute = super(LazyTemplate, self).execute
         self.execute = execute
         return execute
@@ -317,3 +347,9 @@ class LazyTemplate(Template):
         '''Execute
         '''
         return self.prepare()(context)
+
+    def stream(self, context={}):
+        '''Prepare template and stream it
+        '''
+        self.prepare()
+        return self.stream(context)
@@ -172,7 +172,7 @@ def random(value):
     '''Get random item from list or dict
     '''
     return get(value, random_module.random(len(value)))
-filter_manager.register(random)
+filter_manager.register(random, is_volatile=True)
 
 
 def sort(value, order=''):
@@ -1,34 +1,57 @@
 """Basic template tags library
 """
-import collections
 import copy
 from functools import partial
 import itertools
 
-from .context import resolve
-from .tag import tag_manager, parse_token
+from ..cache import manager as cache_manager
+from ..utils import collections_abc
+from .compiler import Block, stream_commands
+from .context import get_stack, resolve
+from .tag import NUMBER, STRING, tag_manager, parse_token
 from .template import LazyTemplate, Template
 
 
 def exec_with_context(func, context={}, context_diff={}):
-    '''Execute function with context switching
+    '''Execute function with context switching. Variables from context_diff
+    are pushed on context stack, so context passed is not changed.
     '''
-    old_values = dict([(var_name,
-                        context[var_name] if var_name in context else None)
-                       for var_name in context_diff])
-    context.update(context_diff)
-    result = func(context)
-    context.update(old_values)
-    return result
+    stack = get_stack(context)
+    stack.push(context_diff)
+    try:
+        return func(stack)
+    finally:
+        stack.pop()
+
+
+def stream_with_context(func, context={}, context_diff={}):
+    '''Stream the results of generator function with context switching
+    '''
+    stack = get_stack(context)
+    stack.push(context_diff)
+    try:
+        for chunk in func(stack):
+            yield chunk
+    finally:
+        stack.pop()
 
 
 def exec_block(block, context):
     '''Helper function that can be used in block tags to execute inner template
     code on a specified context
     '''
+    if isinstance(block, Block):
+        return block(context)
     return "".join([command(context) for command in block])
 
 
+def stream_block(block, context):
+    '''Helper function that can be used in block tags to stream the results of
+    inner template code execution on a specified context
+    '''
+    return stream_commands(block, context)
+
+
 def get_parent_blocks(template):
     '''Get parent blocks
     '''
@@ -127,7 +150,7 @@ def block(token, block, template, loader):
         return template.blocks[token]
     else:
         replace_command(template, template.parent.blocks[token], tmpl)
-        return lambda context: ''
+        return Template.constant('')
 
 tag_manager.register(
         name='block',
@@ -180,7 +203,15 @@ def include(token, context, loader):
     '''
     tokens, types = parse_token(token)
     template = loader.get_template(tokens[0])
-    return exec_with_context(template, context, {})
+    return template(context)
+
+
+def include_stream(token, context, loader):
+    '''Stream included template. See :func:`include`
+    '''
+    tokens, types = parse_token(token)
+    template = loader.get_template(tokens[0])
+    return template.stream(context)
 
 tag_manager.register(
         name='include',
@@ -189,7 +220,8 @@ tag_manager.register(
         is_lazy_tag=True,
         context_required=True,
         template_required=False,
-        loader_required=True
+        loader_required=True,
+        stream=include_stream
 )
 
 
@@ -243,6 +275,15 @@ def with_tag(token, block, context):
     return exec_with_context(partial(exec_block, block), context,
                              {var_name: value})
 
+
+def with_stream(token, block, context):
+    '''Stream with tag block. See :func:`with_tag`
+    '''
+    data_field, _, var_name = token.split(' ')
+    value = resolve(data_field, context)
+    return stream_with_context(partial(stream_block, block), context,
+                               {var_name: value})
+
 tag_manager.register(
         name='with',
         tag=with_tag,
@@ -250,7 +291,8 @@ tag_manager.register(
         context_required=True,
         template_required=False,
         loader_required=False,
-        is_lazy_tag=True
+        is_lazy_tag=True,
+        stream=with_stream
 )
 
 
@@ -277,6 +319,14 @@ def if_tag(token, block, context):
         return exec_block(block, context)
     return ''
 
+
+def if_stream(token, block, context):
+    '''Stream if tag block. See :func:`if_tag`
+    '''
+    if resolve(token, context):
+        return stream_block(block, context)
+    return iter(())
+
 tag_manager.register(
         name='if',
         tag=if_tag,
@@ -284,26 +334,32 @@ tag_manager.register(
         context_required=True,
         template_required=False,
         loader_required=False,
-        is_lazy_tag=True
+        is_lazy_tag=True,
+        stream=if_stream
 )
 
 
-class Forloop:
-    '''Class for executing block in loop with a context update
+class Forloop(object):
+    '''Class for executing block in loop. Loop variables are stored in own
+    context scope, so parent context is not changed. Values are iterated only
+    once, so any iterable (generators, database queries) can be used without
+    loading all the items into memory.
     '''
+    __slots__ = ('block', 'counter0', 'last', 'values', 'var_name', )
 
     def __init__(self, var_name, values, block):
         self.var_name = var_name
         self.values = values
         self.block = block
+        self.counter0 = 0
+        self.last = False
 
     @property
     def total(self):
-        return len(self.values)
-
-    @property
-    def last(self):
-        return not self.counter0 < self.total
+        '''Number of items or None if values does not support len()
+        '''
+        return (len(self.values)
+                if isinstance(self.values, collections_abc.Sized) else None)
 
     @property
     def first(self):
@@ -314,14 +370,36 @@ class Forloop:
         return self.counter0 + 1
 
     def next(self, context):
+        '''Execute block for each value and yield the results
+        '''
+        block = self.block
+        var_name = self.var_name
+        iterator = iter(self.values)
+        try:
+            value = next(iterator)
+        except StopIteration:
+            return
         self.counter0 = 0
-        for v in self.values:
-            context[self.var_name] = v
-            yield exec_block(self.block, context)
-            self.counter0 += 1
+        stack = get_stack(context)
+        stack.push({'forloop': self, var_name: value})
+        try:
+            while True:
+                # Look ahead to know is it last iteration
+                try:
+                    following = next(iterator)
+                except StopIteration:
+                    self.last = True
+                stack[var_name] = value
+                yield exec_block(block, stack)
+                if self.last:
+                    return
+                value = following
+                self.counter0 += 1
+        finally:
+            stack.pop()
 
     def __call__(self, context):
-        return "".join([next for next in self.next(context)])
+        return "".join(self.next(context))
 
 
 def for_tag(token, block, context):
@@ -361,11 +439,21 @@ def for_tag(token, block, context):
     var_name, _, data_field = token.split(' ')
     values = resolve(data_field, context)
     # Check values
-    if not isinstance(values, collections.Iterable):
+    if not isinstance(values, collections_abc.Iterable):
         raise ValueError('%s: "%s" is not iterable' % (data_field, values))
     # execute inline forloop
-    forloop = Forloop(var_name, values, block)
-    return exec_with_context(forloop, context, {'forloop': forloop})
+    return Forloop(var_name, values, block)(context)
+
+
+def for_stream(token, block, context):
+    '''Stream for tag results by iterations. See :func:`for_tag`
+    '''
+    var_name, _, data_field = token.split(' ')
+    values = resolve(data_field, context)
+    # Check values
+    if not isinstance(values, collections_abc.Iterable):
+        raise ValueError('%s: "%s" is not iterable' % (data_field, values))
+    return Forloop(var_name, values, block).next(context)
 
 tag_manager.register(
         name='for',
@@ -374,5 +462,48 @@ tag_manager.register(
         context_required=True,
         template_required=False,
         loader_required=False,
+        is_lazy_tag=True,
+        stream=for_stream
+)
+
+
+def cache_tag(token, block, context):
+    """Cache tag stores rendered block in cache and renders it again only
+    after cached value expired. Tag accepts cache key, time to live in seconds
+    and any number of variables the result depends on:
+
+    .. code-block:: html
+
+        {% cache "sidebar" 300 user.id %}
+            {% for item in menu %}<li>{{ item.title }}</li>{% endfor %}
+        {% endcache %}
+
+    Key and time to live can be variables too. Cache backend is taken from
+    :data:`lighty.cache.manager` with name 'default'.
+    """
+    tokens, types = parse_token(token)
+    if len(tokens) < 2:
+        raise Exception('Cache tag requires key and time to live: "%s"' %
+                        token)
+    values = [value if value_type in (STRING, NUMBER)
+              else resolve(value, context)
+              for value, value_type in zip(tokens, types)]
+    # Values are joined with repr to keep values with separators distinct
+    key = 'template.cache:%r' % (tuple([str(value) for value in
+                                        [values[0]] + values[2:]]), )
+    cache = cache_manager.get_cache()
+    result = cache.get(key)
+    if result is None:
+        result = exec_block(block, context)
+        cache.set(key, result, values[1])
+    return result
+
+tag_manager.register(
+        name='cache',
+        tag=cache_tag,
+        is_block_tag=True,
+        context_required=True,
+        template_required=False,
+        loader_required=False,
         is_lazy_tag=True
 )
@@ -5,6 +5,7 @@ versions and different environment easier:
 - dict_keys - convert dict keys to list
 - div_operators - operators for division
 - with_metaclass - metaclasses
+- collections_abc - abstract base classes for containers
 '''
 import getopt
 import operator
@@ -24,6 +25,10 @@ else:
     string_types = basestring
     dict_keys = lambda keys: keys
     div_operators += (operator.__div__, )
+try:
+    import collections.abc as collections_abc
+except ImportError:
+    import collections as collections_abc
 try:
     import cStringIO
     StringIO = cStringIO.StringIO
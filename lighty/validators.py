@@ -75,6 +75,8 @@ class ChoicesValidator(Validator):
         '''
         for choice in self.choices:
             if value in choice or (hasattr(choice[1], '__iter__') and
+                                   not isinstance(choice[1],
+                                                  utils.string_types) and
                                    value in choice[1]):
                 return value
         return self.error(value)
@@ -6,7 +6,7 @@ from ..db import init_db_manager
 from ..db.backend import manager as db_manager
 from ..templates.loaders import FSLoader
 
-from .urls import load_urls, resolve, reverse
+from .urls import Dispatcher, load_urls
 
 
 class BaseApplication(object):
@@ -17,18 +17,31 @@ class BaseApplication(object):
     def __init__(self, settings):
         self.settings = settings
         self.urls = None
+        self.dispatcher = None
+
+    def get_dispatcher(self):
+        '''Get url dispatcher. Urls are loaded on first call
+        '''
+        if not self.dispatcher:
+            if not self.urls:
+                self.urls = load_urls(self.settings.urls)
+            self.dispatcher = Dispatcher(self.urls)
+        return self.dispatcher
+
+    def preload(self):
+        '''Load urls and build dispatcher before the first request
+        '''
+        self.get_dispatcher()
 
     def resolve_url(self, url, method=None):
         '''Resolve url
         '''
-        if not self.urls:
-            self.urls = load_urls(self.settings.urls)
-        return resolve(self.urls, url, method)
+        return self.get_dispatcher().resolve(url, method)
 
     def reverse_url(self, name, args=None):
         '''Reverse url for name and arguments
         '''
-        return reverse(self.urls, name, args)
+        return self.get_dispatcher().reverse(name, args)
 
 
 class ComplexApplication(BaseApplication):
@@ -48,10 +61,20 @@ class ComplexApplication(BaseApplication):
         # get template directories from settings
         if settings.has_section('TEMPLATE_DIRS'):
             template_dirs += settings.section_options('TEMPLATE_DIRS')
-        self.template_loader = FSLoader(template_dirs)
+        try:
+            cache_dir = settings['template_cache']
+        except KeyError:
+            cache_dir = None
+        self.template_loader = FSLoader(template_dirs, cache_dir)
         # Finish initialization here to prevent database import errors
         super(ComplexApplication, self).__init__(settings)
 
+    def preload(self):
+        '''Load urls and parse all the templates before the first request
+        '''
+        super(ComplexApplication, self).preload()
+        self.template_loader.prepare()
+
     def get_template(self, name):
         '''Get template for name
         '''
@@ -0,0 +1,341 @@
+'''HTTP/1.1 server based on asyncio event loop. Server accepts and parses the
+requests in event loop and executes WSGI application in the thread pool, so
+slow views don't block other connections::
+
+    from lighty.wsgi.aioserver import serve
+    serve(make_application(settings), port=8000, workers=16)
+
+Server supports persistent connections and requests pipelining: requests
+received on one connection are processed one by one and responses are sent in
+the same order. Reading from connection is paused while request is processed,
+so pipelined requests are not queued in memory. Response parts are sent as
+soon as application yields them, with chunked transfer encoding if
+application does not set Content-Length.
+
+Server is started with run_asyncio command. This module requires python 3.4
+or later.
+'''
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from io import BytesIO
+import sys
+import threading
+from urllib.parse import unquote
+
+MAX_HEADERS_SIZE = 64 * 1024
+'''Maximum size of request line and headers'''
+MAX_BODY_SIZE = 64 * 1024 * 1024
+'''Maximum size of request body. Body is read into memory before request
+processing'''
+KEEP_ALIVE_TIMEOUT = 15
+'''Seconds to keep idle connection opened'''
+SERVER_NAME = 'lighty'
+
+
+def to_bytes(data):
+    '''Convert response chunk into bytes
+    '''
+    return data if isinstance(data, bytes) else data.encode('utf-8')
+
+
+class ConnectionClosed(Exception):
+    '''Raised in worker thread when client closed the connection
+    '''
+
+
+class HTTPProtocol(asyncio.Protocol):
+    '''Protocol parses HTTP requests from connection and executes WSGI
+    application for each request
+    '''
+
+    def __init__(self, application, executor, loop, port):
+        super(HTTPProtocol, self).__init__()
+        self.application = application
+        self.executor = executor
+        self.loop = loop
+        self.port = str(port)
+        self.transport = None
+        self.buffer = b''
+        self.processing = False
+        self.reading = True
+        self.closed = False
+        self.can_write = threading.Event()
+        self.can_write.set()
+        self.timeout = None
+        self.continue_sent = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.reset_timeout()
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.can_write.set()
+        if self.timeout is not None:
+            self.timeout.cancel()
+
+    def pause_writing(self):
+        self.can_write.clear()
+
+    def resume_writing(self):
+        self.can_write.set()
+
+    def reset_timeout(self):
+        '''Close connection if there is no requests in keep alive timeout
+        '''
+        if self.timeout is not None:
+            self.timeout.cancel()
+        self.timeout = self.loop.call_later(KEEP_ALIVE_TIMEOUT, self.close)
+
+    def close(self):
+        '''Close the connection
+        '''
+        if not self.closed:
+            self.closed = True
+            self.transport.close()
+
+    def data_received(self, data):
+        '''Add received data to buffer and process request if there is no
+        request processed now. Next pipelined request is parsed from buffer
+        when current request is done
+        '''
+        self.buffer += data
+        if not self.processing:
+            self.process_next()
+
+    def pause_reading(self):
+        '''Stop reading from connection while request is processed
+        '''
+        if self.reading and not self.closed:
+            self.reading = False
+            self.transport.pause_reading()
+
+    def resume_reading(self):
+        '''Continue reading from connection
+        '''
+        if not self.reading and not self.closed:
+            self.reading = True
+            self.transport.resume_reading()
+
+    def send_error(self, status):
+        '''Send error response and close connection. Requests are parsed
+        only when there is no request processed, so error is never written
+        into the previous response
+        '''
+        self.transport.write(('HTTP/1.1 %s\r\nContent-Length: 0\r\n'
+                              'Connection: close\r\n\r\n' %
+                              status).encode('latin-1'))
+        self.close()
+
+    def parse_request(self):
+        '''Parse one request from buffer
+
+        Returns:
+            tuple (environ, keep_alive) or None if request is not complete
+        '''
+        end = self.buffer.find(b'\r\n\r\n')
+        if end < 0:
+            if len(self.buffer) > MAX_HEADERS_SIZE:
+                self.send_error('431 Request Header Fields Too Large')
+            return None
+        lines = self.buffer[:end].decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            self.send_error('400 Bad Request')
+            return None
+        path, _, query = target.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(path, 'latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': SERVER_NAME,
+            'SERVER_PORT': self.port,
+            'SERVER_PROTOCOL': version,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        peer = self.transport.get_extra_info('peername')
+        if peer:
+            environ['REMOTE_ADDR'] = peer[0]
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            key = name.strip().upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = 'HTTP_' + key
+            value = value.strip()
+            if key in environ:
+                value = environ[key] + ',' + value
+            environ[key] = value
+        if 'HTTP_TRANSFER_ENCODING' in environ:
+            self.send_error('411 Length Required')
+            return None
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            self.send_error('400 Bad Request')
+            return None
+        if length > MAX_BODY_SIZE:
+            self.send_error('413 Payload Too Large')
+            return None
+        if len(self.buffer) < end + 4 + length:
+            if (environ.get('HTTP_EXPECT', '').lower() == '100-continue' and
+                    not self.continue_sent):
+                self.transport.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                self.continue_sent = True
+            return None
+        self.continue_sent = False
+        environ['wsgi.input'] = BytesIO(self.buffer[end + 4:end + 4 + length])
+        self.buffer = self.buffer[end + 4 + length:]
+        connection = environ.get('HTTP_CONNECTION', '').lower()
+        keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                      else connection == 'keep-alive')
+        return environ, keep_alive
+
+    def process_next(self):
+        '''Parse next request from buffer and process it in thread pool
+        '''
+        request = None if self.closed else self.parse_request()
+        if request is None:
+            self.processing = False
+            self.resume_reading()
+            return
+        self.processing = True
+        self.pause_reading()
+        if self.timeout is not None:
+            self.timeout.cancel()
+            self.timeout = None
+        environ, keep_alive = request
+        future = self.loop.run_in_executor(self.executor, self.execute,
+                                           environ, keep_alive)
+        future.add_done_callback(self.request_done)
+
+    def request_done(self, future):
+        '''Close connection or process next request
+        '''
+        keep_alive = not future.exception() and future.result()
+        if not keep_alive:
+            self.close()
+            return
+        self.reset_timeout()
+        self.process_next()
+
+    def write(self, data):
+        '''Write data to transport from worker thread
+        '''
+        self.can_write.wait()
+        if self.closed:
+            raise ConnectionClosed()
+        self.loop.call_soon_threadsafe(self.transport.write, data)
+
+    def execute(self, environ, keep_alive):
+        '''Execute WSGI application and send the response. Method is executed
+        in worker thread
+
+        Returns:
+            True if connection should be kept alive
+        '''
+        response = {}
+        state = {'sent': False, 'chunked': False,
+                 'body': environ['REQUEST_METHOD'] != 'HEAD'}
+
+        def send_headers():
+            status, headers = response['status'], response['headers']
+            if status[:1] == '1' or status[:3] in ('204', '304'):
+                # Responses without body must not have body framing
+                state['body'] = False
+            names = [name.lower() for name, _ in headers]
+            if 'content-length' not in names and state['body']:
+                if environ['SERVER_PROTOCOL'] == 'HTTP/1.1':
+                    headers.append(('Transfer-Encoding', 'chunked'))
+                    state['chunked'] = True
+                else:
+                    response['keep_alive'] = False
+            if 'date' not in names:
+                headers.append(('Date', formatdate(usegmt=True)))
+            headers.append(('Server', SERVER_NAME))
+            headers.append(('Connection', 'keep-alive'
+                            if response['keep_alive'] else 'close'))
+            self.write(('%s %s\r\n%s\r\n' % ('HTTP/1.1', status, ''.join([
+                            '%s: %s\r\n' % header for header in headers]))
+                        ).encode('latin-1'))
+            state['sent'] = True
+
+        def send(data):
+            if not state['sent']:
+                send_headers()
+            if data and state['body']:
+                if state['chunked']:
+                    data = (('%x\r\n' % len(data)).encode('latin-1') + data +
+                            b'\r\n')
+                self.write(data)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and state['sent']:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = status
+            response['headers'] = list(headers)
+            return lambda data: send(to_bytes(data))
+
+        response['keep_alive'] = keep_alive
+        try:
+            result = self.application(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        send(to_bytes(chunk))
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            if not state['sent']:
+                send_headers()
+            if state['chunked']:
+                self.write(b'0\r\n\r\n')
+        except ConnectionClosed:
+            return False
+        except Exception:
+            import traceback
+            traceback.print_exc(file=environ['wsgi.errors'])
+            if state['sent']:
+                return False
+            response['status'] = '500 Internal Server Error'
+            response['headers'] = [('Content-Length', '0')]
+            response['keep_alive'] = False
+            try:
+                send_headers()
+            except ConnectionClosed:
+                pass
+            return False
+        return response['keep_alive']
+
+
+def serve(application, host='', port=8000, workers=16):
+    '''Run asyncio HTTP server for WSGI application
+
+    Args:
+        application - WSGI application
+        host - host name or address to listen, all interfaces by default
+        port - port to listen
+        workers - number of threads to execute application
+    '''
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    executor = ThreadPoolExecutor(workers)
+    server = loop.run_until_complete(loop.create_server(
+                lambda: HTTPProtocol(application, executor, loop, port),
+                host or None, port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        executor.shutdown()
+        loop.close()
@@ -2,11 +2,22 @@
 '''
 import functools
 
+def _wrap_application(application, settings):
+    '''Create WSGI application for application object wrapped with middleware
+    from settings
+    '''
+    from .handler import handler
+    from .middleware import wrap_application
+    return wrap_application(functools.partial(handler, application,
+                                              application.resolve_url),
+                            settings)
+
+
 def make_application(settings):
+    '''Create WSGI application wrapped with middleware from settings
+    '''
     from . import ComplexApplication
-    from .handler import handler
-    application = ComplexApplication(settings)
-    return functools.partial(handler, application, application.resolve_url)
+    return _wrap_application(ComplexApplication(settings), settings)
 
 
 def run_server(settings):
@@ -18,6 +29,33 @@ def run_server(settings):
     httpd.serve_forever()
 
 
+def run_asyncio(settings, host='', port='8000', workers='16'):
+    '''Run application using asyncio HTTP/1.1 server with keep-alive and
+    pipelining support. Application is executed in thread pool with workers
+    number of threads
+    '''
+    from .aioserver import serve
+    application = make_application(settings)
+    print("Serving on port %s..." % port)
+    serve(application, host, int(port), int(workers))
+
+
+def run_prefork(settings, host='', port='8000', workers='4', max_requests='0',
+                max_memory='0'):
+    '''Run application in workers number of processes forked from one master
+    process. Worker is restarted after max_requests served or when it
+    allocates more than max_memory megabytes after fork, 0 means no limit
+    '''
+    from . import ComplexApplication
+    from .prefork import serve
+    application = ComplexApplication(settings)
+    # Load urls and templates before fork to share them between workers
+    application.preload()
+    print("Serving on port %s..." % port)
+    serve(_wrap_application(application, settings), host, int(port),
+          int(workers), int(max_requests), int(max_memory))
+
+
 def run_tornado(settings):
     '''Run application using Tornade Web framework WSGI server
     '''
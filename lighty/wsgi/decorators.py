@@ -4,9 +4,13 @@ import functools
 import operator
 import sys
 import traceback
+import types
 
+from ..cache import manager as cache_manager
 from . import http
 
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
 
 def error_page(args, exc):
     '''Build an error page
@@ -62,9 +66,123 @@ def view(func, **constraints):
                 response = http.Response('Wrong view argument value', 500)
             else:
                 response = func(*args, **kwargs)
-                if not isinstance(response, http.Response):
+                if isinstance(response, types.GeneratorType):
+                    response = http.StreamingResponse(response)
+                elif not isinstance(response, http.Response):
                     response = http.Response(response)
         except Exception as exc:
             response = http.Response(error_page(args, exc), 500)
         return response
     return wrapper
+
+
+class PageCache(object):
+    '''Whole page cache options for a view. Handler checks this cache before
+    request object creation and view execution and stores successfull non
+    streaming responses in it. Responses get Vary header with request headers
+    cache key depends on. Responses vary on other headers are not cached.
+    '''
+
+    def __init__(self, ttl, vary=(), cookies=(), cache='default'):
+        '''Create new page cache options
+
+        Args:
+            ttl - time to live for cached response in seconds
+            vary - names of request headers response depends on
+            cookies - names of cookies response depends on
+            cache - name of cache backend in :data:`lighty.cache.manager`
+        '''
+        super(PageCache, self).__init__()
+        self.ttl = ttl
+        self.vary = tuple(['HTTP_' + header.upper().replace('-', '_')
+                           for header in vary])
+        self.cookies = tuple(cookies)
+        self.cache = cache
+        self.vary_headers = tuple(vary) + (('Cookie', ) if cookies else ())
+        self.varies = set([header.lower() for header in self.vary_headers])
+
+    def get_key(self, environ):
+        '''Get cache key for request environment or None if request could
+        not be cached
+        '''
+        method = environ['REQUEST_METHOD']
+        if method not in CACHEABLE_METHODS:
+            return None
+        parts = ['page', method, environ.get('SCRIPT_NAME', ''),
+                 environ['PATH_INFO'], environ.get('QUERY_STRING', '')]
+        parts.extend([environ.get(header, '') for header in self.vary])
+        if self.cookies:
+            cookies = http.SimpleCookie()
+            cookies.load(environ.get('HTTP_COOKIE', ''))
+            parts.extend([cookies[name].value if name in cookies else ''
+                          for name in self.cookies])
+        return '\n'.join(parts)
+
+    def get(self, key):
+        '''Get cached response for key
+
+        Returns:
+            response or None if there is no valid response cached
+        '''
+        cached = cache_manager.get_cache(self.cache).get(key)
+        if cached is None:
+            return None
+        code, headers, data = cached
+        return http.Response(data, code, list(headers))
+
+    def add_vary(self, response):
+        '''Add request headers cache key depends on into response Vary header
+
+        Returns:
+            set of lower case names of all the headers response varies on
+        '''
+        names = []
+        headers = []
+        for name, value in response.headers:
+            if name.lower() == 'vary':
+                names.extend([header.strip() for header in value.split(',')
+                              if header.strip()])
+            else:
+                headers.append((name, value))
+        varies = set([name.lower() for name in names])
+        names.extend([header for header in self.vary_headers
+                      if header.lower() not in varies])
+        if names:
+            headers.append(('Vary', ', '.join(names)))
+        response.headers = headers
+        return set([name.lower() for name in names])
+
+    def set(self, key, response):
+        '''Add Vary header into response and store it in cache if it could
+        be cached
+        '''
+        varies = self.add_vary(response)
+        names = [name.lower() for name, _ in response.headers]
+        if (response.code != 200 or not varies <= self.varies or
+                isinstance(response, (http.FileResponse,
+                                      http.StreamingResponse)) or
+                'set-cookie' in names):
+            return
+        cache_manager.get_cache(self.cache).set(
+                key, (response.code, tuple(response.headers),
+                      response.finish()), self.ttl)
+
+
+def cache_page(ttl, vary=(), cookies=(), cache='default'):
+    '''Decorator enables whole page caching for a view. Cached response is
+    returned by handler without request creation and view execution::
+
+        @cache_page(300, vary=('Accept-Language', ), cookies=('sessionid', ))
+        def index(request):
+            return request.app.get_template('index.html')({})
+
+    Only GET and HEAD requests with 200 response code are cached. Responses
+    with cookies, streaming and file responses are never cached. Headers and
+    cookies from vary and cookies are added into Vary header of response and
+    responses vary on any other header are not cached.
+    '''
+    def decorator(func):
+        wrapper = func if hasattr(func, 'is_view') else view(func)
+        wrapper.page_cache = PageCache(ttl, vary, cookies, cache)
+        return wrapper
+    return decorator
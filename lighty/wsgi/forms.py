@@ -0,0 +1,278 @@
+'''Module contains incremental parsers for request body. Request body is read
+from wsgi.input by chunks with bounded size, so parsing does not require to
+load whole body into memory. File parts of multipart forms are written into
+spooled temporary files which are stored in memory while they are small and
+moved to disk when they grow::
+
+    fields, files = parse_form(environ)
+    upload = files['avatar']
+    upload.filename  # 'me.png'
+    upload.file.read()
+'''
+import tempfile
+try:
+    import urllib
+    unquote_plus = urllib.unquote_plus
+except AttributeError:
+    from urllib import parse
+    unquote_plus = parse.unquote_plus
+
+CHUNK_SIZE = 64 * 1024
+'''Maximum size of data read from wsgi.input at once'''
+MAX_MEMORY_SIZE = 1024 * 1024
+'''Maximum size of uploaded file stored in memory'''
+MAX_FIELD_SIZE = 1024 * 1024
+'''Maximum size of the form field except files'''
+MAX_HEADERS_SIZE = 16 * 1024
+'''Maximum size of the multipart part headers'''
+FORM_URLENCODED = 'application/x-www-form-urlencoded'
+FORM_MULTIPART = 'multipart/form-data'
+
+
+def to_string(data):
+    '''Convert bytes into string
+    '''
+    return data if isinstance(data, str) else data.decode('utf-8', 'replace')
+
+
+def add_value(values, name, value):
+    '''Add value into dictionary. If there is few values for the same name
+    they are stored as list
+    '''
+    if name in values:
+        if isinstance(values[name], list):
+            values[name].append(value)
+        else:
+            values[name] = [values[name], value]
+    else:
+        values[name] = value
+
+
+def parse_header(value):
+    '''Parse header value with params, e.g.
+    'multipart/form-data; boundary=AaB03x'
+
+    Returns:
+        tuple (value, params dictionary)
+    '''
+    parts = value.split(';')
+    params = {}
+    for part in parts[1:]:
+        name, _, param = part.partition('=')
+        param = param.strip()
+        if len(param) > 1 and param[0] == param[-1] == '"':
+            param = param[1:-1]
+        params[name.strip().lower()] = param
+    return parts[0].strip().lower(), params
+
+
+def read_chunks(environ, chunk_size=CHUNK_SIZE):
+    '''Read request body by chunks. No more than CONTENT_LENGTH bytes are
+    read from wsgi.input
+
+    Returns:
+        generator yields bytes
+    '''
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    stream = environ.get('wsgi.input')
+    while length > 0 and stream is not None:
+        chunk = stream.read(min(chunk_size, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
+
+
+class UploadedFile(object):
+    '''File uploaded with multipart form. Data is stored in spooled temporary
+    file available as file attribute
+    '''
+
+    def __init__(self, name, filename, content_type):
+        '''Create new uploaded file with empty temporary file
+        '''
+        super(UploadedFile, self).__init__()
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.file = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_SIZE)
+        self.size = 0
+
+    def write(self, data):
+        '''Append data to file
+        '''
+        self.file.write(data)
+        self.size += len(data)
+
+    def read(self, size=-1):
+        '''Read data from file
+        '''
+        return self.file.read(size)
+
+    def close(self):
+        '''Close and remove temporary file
+        '''
+        self.file.close()
+
+
+class FieldBuffer(object):
+    '''Buffer collects data of the simple form field
+    '''
+
+    def __init__(self, name):
+        super(FieldBuffer, self).__init__()
+        self.name = name
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        '''Append data to field value
+        '''
+        self.size += len(data)
+        if self.size > MAX_FIELD_SIZE:
+            raise Exception('Form field "%s" is too large' % self.name)
+        self.parts.append(data)
+
+    def get_value(self):
+        '''Get field value as string
+        '''
+        return to_string(b''.join(self.parts))
+
+
+def parse_urlencoded(chunks):
+    '''Parse url encoded form data
+
+    Args:
+        chunks - iterable over the body chunks
+
+    Returns:
+        dictionary contains form fields
+    '''
+    fields = {}
+    buffer = b''
+    for chunk in chunks:
+        pairs = (buffer + chunk).split(b'&')
+        buffer = pairs.pop()
+        if len(buffer) > MAX_FIELD_SIZE:
+            raise Exception('Form field is too large')
+        for pair in pairs:
+            add_pair(fields, pair)
+    add_pair(fields, buffer)
+    return fields
+
+
+def add_pair(fields, pair):
+    '''Decode url encoded pair name=value and add it to fields dictionary
+    '''
+    if not pair:
+        return
+    name, _, value = to_string(pair).partition('=')
+    add_value(fields, unquote_plus(name), unquote_plus(value))
+
+
+def parse_multipart(chunks, boundary):
+    '''Parse multipart form data. Files are written into temporary files as
+    soon as data received
+
+    Args:
+        chunks - iterable over the body chunks
+        boundary - parts boundary from Content-Type header
+
+    Returns:
+        tuple of dictionaries (fields, files)
+    '''
+    if not isinstance(boundary, bytes):
+        boundary = boundary.encode('latin-1')
+    delimiter = b'--' + boundary
+    separator = b'\r\n' + delimiter
+    fields = {}
+    files = {}
+    buffer = b''
+    part = None
+    state = 'preamble'
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if state == 'preamble':
+                index = buffer.find(delimiter)
+                if index < 0:
+                    buffer = buffer[-len(delimiter):]
+                    break
+                buffer = buffer[index + len(delimiter):]
+                state = 'delimiter'
+            elif state == 'delimiter':
+                # Delimiter is followed by '--' for the last part or CRLF
+                if len(buffer) < 2:
+                    break
+                if buffer[:2] == b'--':
+                    return fields, files
+                state = 'headers'
+            elif state == 'headers':
+                index = buffer.find(b'\r\n\r\n')
+                if index < 0:
+                    if len(buffer) > MAX_HEADERS_SIZE:
+                        raise Exception('Multipart headers are too large')
+                    break
+                part = create_part(to_string(buffer[:index]))
+                buffer = buffer[index + 4:]
+                state = 'body'
+            else:
+                index = buffer.find(separator)
+                if index < 0:
+                    # Keep the tail could contain the start of separator
+                    keep = len(separator) - 1
+                    if len(buffer) > keep:
+                        part.write(buffer[:-keep])
+                        buffer = buffer[-keep:]
+                    break
+                part.write(buffer[:index])
+                buffer = buffer[index + len(separator):]
+                if isinstance(part, UploadedFile):
+                    part.file.seek(0)
+                    add_value(files, part.name, part)
+                else:
+                    add_value(fields, part.name, part.get_value())
+                part = None
+                state = 'delimiter'
+    if part is not None:
+        raise Exception('Multipart form data is not finished')
+    return fields, files
+
+
+def create_part(headers):
+    '''Create field buffer or uploaded file for multipart part headers
+    '''
+    disposition = {}
+    content_type = 'application/octet-stream'
+    for line in headers.split('\r\n'):
+        name, _, value = line.partition(':')
+        name = name.strip().lower()
+        if name == 'content-disposition':
+            _, disposition = parse_header(value)
+        elif name == 'content-type':
+            content_type = value.strip()
+    if 'name' not in disposition:
+        raise Exception('Multipart part has no name')
+    if 'filename' in disposition:
+        return UploadedFile(disposition['name'], disposition['filename'],
+                            content_type)
+    return FieldBuffer(disposition['name'])
+
+
+def parse_form(environ):
+    '''Parse request body contains url encoded or multipart form data
+
+    Returns:
+        tuple of dictionaries (fields, files)
+    '''
+    content_type, params = parse_header(environ.get('CONTENT_TYPE', ''))
+    if content_type == FORM_URLENCODED:
+        return parse_urlencoded(read_chunks(environ)), {}
+    elif content_type == FORM_MULTIPART:
+        if 'boundary' not in params:
+            raise Exception('Multipart boundary is not specified')
+        return parse_multipart(read_chunks(environ), params['boundary'])
+    return {}, {}
@@ -1,13 +1,26 @@
 '''Provides a handler to accept the requests
 '''
-from .http import Request
+import functools
+
+from .http import FileResponse, Request
 
 
 def handler(application, resolve_url, environ, start_response):
-    '''Create request object, resolve url, execute view and send response
+    '''Resolve url, create request object, execute view and send response.
+    If view has page cache enabled (see :func:`decorators.cache_page`) cached
+    response is sent without request creation and view execution.
     '''
-    request = Request(application, environ)
     view = resolve_url(environ['PATH_INFO'], environ['REQUEST_METHOD'])
-    response = view(request)
+    func = view.func if isinstance(view, functools.partial) else view
+    page_cache = getattr(func, 'page_cache', None)
+    key = page_cache.get_key(environ) if page_cache is not None else None
+    response = page_cache.get(key) if key is not None else None
+    if response is None:
+        request = Request(application, environ)
+        response = view(request)
+        if key is not None:
+            page_cache.set(key, response)
     start_response(response.status, response.headers)
-    return str(response)
+    if isinstance(response, FileResponse):
+        return response.wrap(environ)
+    return response
@@ -1,6 +1,5 @@
 '''Module contains methods to work with request and response objects
 '''
-import collections
 try:
     import Cookie
     SimpleCookie = Cookie.SimpleCookie
@@ -20,29 +19,102 @@ except:
     from urllib import parse
     parse_qsl = parse.parse_qsl
 
+from ..utils import collections_abc
+from .forms import add_value, parse_form
 
-class Request(collections.Mapping):
-    '''WSGI request wrapper
+CONTENT_HEADERS = ('CONTENT_TYPE', 'CONTENT_LENGTH', )
+CHUNK_SIZE = 64 * 1024
+'''Size of file chunks sent to client'''
+
+
+def get_header_name(name):
+    '''Get header name from environment variable name, e.g.
+    'Accept-Language' for 'HTTP_ACCEPT_LANGUAGE'
+    '''
+    if name.startswith('HTTP_'):
+        name = name[5:]
+    return '-'.join([part.capitalize() for part in name.split('_')])
+
+
+def parse_params(query):
+    '''Parse url encoded params
+
+    Returns:
+        dictionary maps param name to value or list of values
     '''
-    __slots__ = ('__contains__', '__getitem__', '__iter__', '__len__', 'app',
-                 'cookies', 'get', 'headers', 'meta', 'method', 'params',
-                 'path', )
+    params = {}
+    for name, value in parse_qsl(query):
+        add_value(params, name, value)
+    return params
+
+
+class Request(collections_abc.Mapping):
+    '''WSGI request wrapper. Cookies, query string params, headers and form
+    data are parsed only on first access. Request body is parsed by chunks and
+    uploaded files are spooled to temporary files (see :mod:`forms`)
+    '''
+    __slots__ = ('_cookies', '_files', '_form', '_headers', '_params', 'app',
+                 'meta', 'method', 'path', )
 
     def __init__(self, application, environ):
         '''Init request instance from environment
         '''
         self.app = application
-        cookie_loader = SimpleCookie()
-        cookie_loader.load(environ['HTTP_COOKIE']
-                           if 'HTTP_COOKIE' in environ
-                           else '')
-        self.cookies = dict(cookie_loader)
-        self.headers = {}
         self.meta = environ
         self.method = environ['REQUEST_METHOD']
         self.path = environ['PATH_INFO']
-        self.params = dict([(name, values[0] if len(values) == 1 else values)
-                    for name, values in parse_qsl(environ['QUERY_STRING'])])
+        self._cookies = None
+        self._files = None
+        self._form = None
+        self._headers = None
+        self._params = None
+
+    @property
+    def cookies(self):
+        '''Get dictionary contains cookies sent by client
+        '''
+        if self._cookies is None:
+            cookie_loader = SimpleCookie()
+            cookie_loader.load(self.meta.get('HTTP_COOKIE', ''))
+            self._cookies = dict(cookie_loader)
+        return self._cookies
+
+    @property
+    def params(self):
+        '''Get dictionary contains query string params
+        '''
+        if self._params is None:
+            self._params = parse_params(self.meta.get('QUERY_STRING', ''))
+        return self._params
+
+    @property
+    def headers(self):
+        '''Get dictionary contains request headers, e.g. 'Accept-Language'
+        '''
+        if self._headers is None:
+            self._headers = dict([(get_header_name(name), value)
+                                  for name, value in self.meta.items()
+                                  if name.startswith('HTTP_') or
+                                     name in CONTENT_HEADERS])
+        return self._headers
+
+    @property
+    def form(self):
+        '''Get dictionary contains url encoded or multipart form fields sent
+        in request body. Request body is read on first access
+        '''
+        if self._form is None:
+            self._form, self._files = parse_form(self.meta)
+        return self._form
+
+    @property
+    def files(self):
+        '''Get dictionary contains files uploaded with multipart form. Values
+        are :class:`forms.UploadedFile` instances
+        '''
+        if self._files is None:
+            self._form, self._files = parse_form(self.meta)
+        return self._files
 
     def get(self, name, default=None):
         '''Get item from params with default value
@@ -62,7 +134,7 @@ class Request(collections.Mapping):
     def __iter__(self):
         '''Get iterator over the request params
         '''
-        return self.params.iter()
+        return iter(self.params)
 
     def __len__(self):
         '''Get the number of items in request
@@ -73,7 +145,7 @@ class Request(collections.Mapping):
 class Response(object):
     '''Class represents response
     '''
-    __slots__ = ('__init__', '__str__', 'data', 'code', 'headers', 'status', )
+    __slots__ = ('data', 'code', 'headers', )
 
     def __init__(self, data='', code=200, headers=None):
         self.data = data
@@ -96,5 +168,98 @@ class Response(object):
         Returns:
             data stored in response converted to string
         '''
-        return str(self.data)
+        return self.data if isinstance(self.data, bytes) else str(self.data)
+    __str__ = finish
+
+    def __iter__(self):
+        '''Get iterator over the response parts. Response object can be
+        returned directly as WSGI application result
+        '''
+        yield self.finish()
+
+
+class StreamingResponse(Response):
+    '''Response that sends the data by parts. Data can be any iterable, as
+    example template stream::
+
+        StreamingResponse(template.stream({'items': Item.all()}))
+
+    Parts are sent to client as soon as they are produced so client gets first
+    bytes before the whole page is rendered.
+    '''
+    __slots__ = ()
+
+    def finish(self):
+        '''Get whole response string. It consumes the data iterator
+
+        Returns:
+            all the data parts joined in one string
+        '''
+        return ''.join([str(chunk) for chunk in self])
+    __str__ = finish
+
+    def __iter__(self):
+        '''Get iterator over the response parts
+        '''
+        for chunk in self.data:
+            yield str(chunk)
+
+    def close(self):
+        '''Close the data iterator if it supports closing. WSGI server calls
+        this method after response was sent or client disconnected
+        '''
+        if hasattr(self.data, 'close'):
+            self.data.close()
+
+
+class FileResponse(Response):
+    '''Response sends the file by chunks without reading it into memory.
+    Response can send the part of the file starting from offset::
+
+        FileResponse(open(path, 'rb'), 206, headers, offset=100, length=50)
+
+    If length is None file is sent till the end.
+    '''
+    __slots__ = ('length', 'offset', )
+
+    def __init__(self, file, code=200, headers=None, offset=0, length=None):
+        super(FileResponse, self).__init__(file, code, headers)
+        self.offset = offset
+        self.length = length
+
+    def finish(self):
+        '''Read the whole file part
+        '''
+        return b''.join([chunk for chunk in self])
     __str__ = finish
+
+    def __iter__(self):
+        '''Get iterator over the file chunks
+        '''
+        file = self.data
+        file.seek(self.offset)
+        remaining = self.length
+        while remaining is None or remaining > 0:
+            chunk = file.read(CHUNK_SIZE if remaining is None
+                              else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        '''Close the file
+        '''
+        self.data.close()
+
+    def wrap(self, environ):
+        '''Get result for WSGI server. If server provides wsgi.file_wrapper
+        and file is sent till the end server's wrapper is used, so server can
+        send the file with platform specific methods like sendfile
+        '''
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is None or self.length is not None:
+            return self
+        self.data.seek(self.offset)
+        return file_wrapper(self.data, CHUNK_SIZE)
@@ -0,0 +1,217 @@
+'''Module contains middleware support and basic middleware classes.
+
+Middleware is a factory accepts WSGI application and settings and returns new
+WSGI application wraps the original one. Middleware list is specified in
+settings with full names separated by whitespaces or new lines::
+
+    [MIDDLEWARE]
+    middleware = lighty.wsgi.middleware.GzipMiddleware
+                 app.middleware.TimingMiddleware
+
+The first middleware in list is the outermost one, so it gets the request
+first and the response last.
+'''
+import zlib
+
+COMPRESSED_TYPES = ('application/gzip', 'application/octet-stream',
+                    'application/pdf', 'application/x-7z-compressed',
+                    'application/x-bzip2', 'application/x-gzip',
+                    'application/x-rar-compressed', 'application/zip',
+                    'audio/', 'font/woff', 'image/', 'video/', )
+'''Content types that are already compressed'''
+UNCOMPRESSED_TYPES = ('image/svg+xml', 'image/x-icon', )
+'''Exceptions from compressed types'''
+GZIP_MIN_SIZE = 200
+'''Default minimum response size to compress'''
+GZIP_LEVEL = 6
+'''Default compression level'''
+WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+def load_object(path):
+    '''Import object by full name, e.g. 'lighty.wsgi.middleware.Gzip'
+    '''
+    module_name, _, name = path.rpartition('.')
+    module = __import__(module_name, globals(), locals(), name)
+    if not hasattr(module, name):
+        raise ImportError('%s could not be loaded' % path)
+    return getattr(module, name)
+
+
+def wrap_application(application, settings):
+    '''Wrap WSGI application with all the middleware specified in settings
+
+    Returns:
+        WSGI application
+    '''
+    for name in reversed(get_option(settings, 'middleware', '').split()):
+        application = load_object(name)(application, settings)
+    return application
+
+
+def get_option(settings, name, default):
+    '''Get option from settings or default value
+    '''
+    try:
+        return settings[name]
+    except KeyError:
+        return default
+
+
+def get_encodings(accept_encoding):
+    '''Parse Accept-Encoding header value
+
+    Returns:
+        dictionary maps content coding name to quality value
+    '''
+    encodings = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings['gzip' if name == 'x-gzip' else name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    '''Choose content coding for Accept-Encoding header value
+
+    Returns:
+        'gzip', 'deflate' or None if client does not accept compression
+    '''
+    encodings = get_encodings(accept_encoding)
+    default = encodings.get('*', 0.0)
+    gzip = encodings.get('gzip', default)
+    deflate = encodings.get('deflate', default)
+    if gzip <= 0 and deflate <= 0:
+        return None
+    return 'gzip' if gzip >= deflate else 'deflate'
+
+
+def to_bytes(data):
+    '''Convert response chunk into bytes
+    '''
+    return data if isinstance(data, bytes) else data.encode('utf-8')
+
+
+class GzipMiddleware(object):
+    '''Middleware compresses responses with gzip or deflate content coding
+    accepted by client. Compression is incremental, so streaming responses are
+    sent by parts as before. Responses are not compressed if they:
+
+    - already have Content-Encoding header
+    - have compressed content type, e.g. images or archives
+    - are smaller than gzip_min_size setting (200 bytes by default)
+    - are partial content or have no body
+
+    Compression level can be set with gzip_level setting.
+    '''
+
+    def __init__(self, application, settings):
+        '''Create new middleware wraps application
+        '''
+        super(GzipMiddleware, self).__init__()
+        self.application = application
+        self.min_size = int(get_option(settings, 'gzip_min_size',
+                                       GZIP_MIN_SIZE))
+        self.level = int(get_option(settings, 'gzip_level', GZIP_LEVEL))
+
+    def is_compressible(self, status, headers):
+        '''Check can response with status and headers be compressed
+        '''
+        if status[:3] in ('204', '206', '304'):
+            return False
+        for name, value in headers:
+            name = name.lower()
+            if name in ('content-encoding', 'content-range'):
+                return False
+            elif name == 'content-length':
+                try:
+                    if int(value) < self.min_size:
+                        return False
+                except ValueError:
+                    return False
+            elif name == 'content-type':
+                content_type = value.split(';')[0].strip().lower()
+                if (content_type.startswith(COMPRESSED_TYPES) and
+                        content_type not in UNCOMPRESSED_TYPES):
+                    return False
+        return True
+
+    def __call__(self, environ, start_response):
+        '''Execute application and compress the response if possible
+        '''
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.application(environ, start_response)
+        response = []
+        chunks = []
+
+        def capture(status, headers, exc_info=None):
+            response[:] = [status, headers, exc_info]
+            return chunks.append
+        result = self.application(environ, capture)
+        if response and not chunks and not self.is_compressible(*response[:2]):
+            # Pass the result as is, so server can use wsgi.file_wrapper
+            start_response(*response)
+            return result
+        return self.compress(result, response, chunks, encoding,
+                             start_response)
+
+    def compress(self, result, response, chunks, encoding, start_response):
+        '''Compress the result of application. Response is buffered until
+        minimum size reached, then compressed by chunks
+
+        Returns:
+            generator yields compressed chunks
+        '''
+        try:
+            iterator = iter(result)
+            chunks = [to_bytes(chunk) for chunk in chunks]
+            size = sum([len(chunk) for chunk in chunks])
+            if size < self.min_size:
+                for chunk in iterator:
+                    chunk = to_bytes(chunk)
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if (size >= self.min_size or
+                            not self.is_compressible(*response[:2])):
+                        break
+            status, headers, exc_info = response
+            if size < self.min_size or not self.is_compressible(status,
+                                                                headers):
+                start_response(status, headers, exc_info)
+                for chunk in chunks:
+                    yield chunk
+                for chunk in iterator:
+                    yield to_bytes(chunk)
+                return
+            vary = [value for name, value in headers if name.lower() == 'vary']
+            headers = [(name, value) for name, value in headers
+                       if name.lower() not in ('content-length', 'vary')]
+            headers.append(('Content-Encoding', encoding))
+            if 'accept-encoding' not in ', '.join(vary).lower():
+                vary.append('Accept-Encoding')
+            headers.append(('Vary', ', '.join(vary)))
+            start_response(status, headers, exc_info)
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                          WBITS[encoding])
+            data = compressor.compress(b''.join(chunks))
+            for chunk in iterator:
+                # Flush each part to keep streaming responses streaming
+                data += compressor.compress(to_bytes(chunk))
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                yield data
+                data = b''
+            yield data + compressor.flush()
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,296 @@
+'''Pre-fork server runs WSGI application in a number of worker processes
+accept connections from one shared listening socket. Application is created in
+master process and loads urls and parses templates before fork, so settings,
+urls and templates are shared between workers copy-on-write::
+
+    from lighty.wsgi.prefork import serve
+    application = ComplexApplication(settings)
+    application.preload()
+    serve(functools.partial(handler, application, application.resolve_url),
+          port=8000, workers=4)
+
+The same is done by run_prefork command.
+
+Master process restarts crashed workers and replaces workers served
+max_requests requests or allocated more than max_memory megabytes after fork.
+Memory shared with master is not counted, so preloaded application does not
+make workers recycled right after start. After fork each
+worker sends POST_FORK signal with worker number through
+:data:`lighty.signals.dispatcher`, so applications can reinitialize the
+resources couldn't be shared between processes, e.g. database connections::
+
+    from lighty.signals import dispatcher
+    from lighty.wsgi.prefork import POST_FORK
+    dispatcher.channel(POST_FORK, lambda workers: reconnect())
+
+Works only on systems support fork.
+'''
+import errno
+import fcntl
+import os
+import resource
+import select
+import signal
+import socket
+import sys
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from ..signals import dispatcher
+
+POST_FORK = '/wsgi/post_fork/'
+'''Signal sent in worker process after fork'''
+MIN_WORKER_LIFETIME = 1
+'''Worker exited faster than this number of seconds is restarted with delay
+to prevent fork loop when application fails on start'''
+POLL_INTERVAL = 1
+'''Seconds between recycling checks in idle worker and exited workers checks
+in master'''
+
+
+class QuietHandler(WSGIRequestHandler):
+    '''Request handler does not log each request into stderr
+    '''
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkerServer(WSGIServer):
+    '''WSGI server counts handled requests
+    '''
+    requests = 0
+
+    def process_request(self, request, client_address):
+        '''Handle request and increase counter
+        '''
+        self.requests += 1
+        WSGIServer.process_request(self, request, client_address)
+
+
+def create_socket(host, port, backlog=128):
+    '''Create listening socket
+    '''
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+def get_memory_usage():
+    '''Get resident set size of current process in megabytes. Maximum
+    resident set size is used on systems without /proc
+    '''
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / (1024.0 * 1024.0)
+    except (IOError, OSError, IndexError, ValueError):
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux returns kilobytes and Mac OS returns bytes
+    return usage / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+class Worker(object):
+    '''Worker process serves requests from shared socket
+    '''
+
+    def __init__(self, application, listener, number, max_requests=0,
+                 max_memory=0):
+        '''Create worker
+
+        Args:
+            application - WSGI application
+            listener - shared listening socket
+            number - worker number
+            max_requests - number of requests to serve before exit, 0 means
+                no limit
+            max_memory - limit for memory allocated after fork in megabytes,
+                0 means no limit
+        '''
+        super(Worker, self).__init__()
+        self.application = application
+        self.listener = listener
+        self.number = number
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.initial_memory = 0
+        self.alive = True
+
+    def create_server(self):
+        '''Create WSGI server uses shared listening socket
+        '''
+        server = WorkerServer(self.listener.getsockname(), QuietHandler,
+                              bind_and_activate=False)
+        server.socket.close()
+        server.socket = self.listener
+        host, port = self.listener.getsockname()[:2]
+        server.server_name = socket.getfqdn(host)
+        server.server_port = port
+        server.setup_environ()
+        server.set_app(self.application)
+        server.timeout = POLL_INTERVAL
+        return server
+
+    def stop(self, signum, frame):
+        '''Stop serving after current request
+        '''
+        self.alive = False
+
+    def should_recycle(self, requests):
+        '''Check is worker reached requests number or memory limit
+        '''
+        return ((self.max_requests and requests >= self.max_requests) or
+                (self.max_memory and
+                 get_memory_usage() - self.initial_memory > self.max_memory))
+
+    def run(self):
+        '''Serve requests until worker stopped or recycled
+        '''
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Memory inherited from master is counted in resident set size
+        self.initial_memory = get_memory_usage()
+        dispatcher.signal(POST_FORK, [self.number])
+        server = self.create_server()
+        while self.alive and not self.should_recycle(server.requests):
+            try:
+                # Returns after timeout if there are no requests
+                server.handle_request()
+            except (IOError, OSError, socket.error):
+                # Interrupted by signal or connection error
+                continue
+
+
+class Master(object):
+    '''Master process forks and watches the workers
+    '''
+
+    def __init__(self, application, listener, workers=4, max_requests=0,
+                 max_memory=0):
+        super(Master, self).__init__()
+        self.application = application
+        self.listener = listener
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.children = {}
+        self.alive = True
+        self.pipe = None
+
+    def spawn(self, number):
+        '''Fork new worker process with number specified
+        '''
+        pid = os.fork()
+        if pid != 0:
+            self.children[pid] = (number, time.time())
+            return
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            for fd in self.pipe:
+                os.close(fd)
+            Worker(self.application, self.listener, number,
+                   self.max_requests, self.max_memory).run()
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def wakeup(self, signum, frame):
+        '''Wake up master process waiting for signals
+        '''
+        try:
+            os.write(self.pipe[1], b'.')
+        except OSError:
+            # Pipe is full, master will wake up anyway
+            pass
+
+    def stop(self, signum, frame):
+        '''Stop all the workers and exit
+        '''
+        self.alive = False
+        self.wakeup(signum, frame)
+
+    def wait(self):
+        '''Wait for signal or poll interval. Signal handlers write into pipe,
+        so signal is noticed even if interrupted system calls are restarted
+        '''
+        try:
+            select.select([self.pipe[0]], [], [], POLL_INTERVAL)
+            while os.read(self.pipe[0], 512):
+                pass
+        except (select.error, IOError, OSError):
+            # Interrupted by signal or pipe is empty
+            pass
+
+    def restart_exited(self):
+        '''Restart all the exited workers
+        '''
+        while self.alive:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as error:
+                if error.errno == errno.EINTR:
+                    continue
+                return
+            if pid == 0:
+                return
+            if pid not in self.children:
+                continue
+            number, started = self.children.pop(pid)
+            if time.time() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if self.alive:
+                self.spawn(number)
+
+    def run(self):
+        '''Start workers and restart them when they exit
+        '''
+        self.pipe = os.pipe()
+        for fd in self.pipe:
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGCHLD, self.wakeup)
+        for number in range(self.workers):
+            self.spawn(number)
+        while self.alive:
+            self.wait()
+            self.restart_exited()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for pid in list(self.children.keys()):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in list(self.children.keys()):
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        for fd in self.pipe:
+            os.close(fd)
+        self.listener.close()
+
+
+def serve(application, host='', port=8000, workers=4, max_requests=0,
+          max_memory=0):
+    '''Run pre-fork server for WSGI application
+
+    Args:
+        application - WSGI application
+        host - host name or address to listen, all interfaces by default
+        port - port to listen
+        workers - number of worker processes
+        max_requests - requests number after which worker is replaced
+        max_memory - megabytes allocated by worker after fork after which
+            worker is replaced
+    '''
+    listener = create_socket(host, port)
+    Master(application, listener, workers, max_requests, max_memory).run()
@@ -1,17 +1,215 @@
 '''Provide simple view to serve a static files
+
+Files are sent by chunks (or with server's wsgi.file_wrapper if available)
+without reading the whole file into memory. View sets ETag and Last-Modified
+headers, answers conditional requests with 304 Not Modified and supports
+single byte range requests.
+
+Small files can be kept in memory together with gzip compressed version. To
+enable the cache set the memory budget in bytes in settings::
+
+    [STATIC]
+    static_cache_size = 16777216
+
+Cached files are checked for modification on each request and compressed
+version is sent to clients accept gzip encoding. Compressed version has its
+own ETag and is never used for range requests.
 '''
+import collections
+import email.utils
 import mimetypes
+import os
 import os.path
+import threading
+import zlib
 
 from . import http, urls
+from .middleware import get_encodings
 
 mimetypes.init()
 
+COMPRESSIBLE_TYPES = ('application/javascript', 'application/json',
+                      'application/x-javascript', 'application/xml',
+                      'image/svg+xml', )
+MAX_CACHED_FILE_SIZE = 1024 * 1024
+'''Files larger than this size are never cached in memory'''
+
+
+class StaticEntry(object):
+    '''Cached static file
+    '''
+    __slots__ = ('content_type', 'data', 'etag', 'gzip_data',
+                 'last_modified', 'mtime', 'size', )
+
+    def __init__(self, file_path, stat):
+        '''Read file and compress it if needed
+        '''
+        super(StaticEntry, self).__init__()
+        with open(file_path, 'rb') as file:
+            self.data = file.read()
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self.etag = get_etag(stat)
+        self.last_modified = email.utils.formatdate(stat.st_mtime,
+                                                    usegmt=True)
+        self.content_type = get_content_type(file_path)
+        self.gzip_data = None
+        if (self.content_type.startswith('text/') or
+                self.content_type in COMPRESSIBLE_TYPES):
+            compressor = zlib.compressobj(9, zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+            data = compressor.compress(self.data) + compressor.flush()
+            if len(data) < len(self.data):
+                self.gzip_data = data
+
+    def get_memory_size(self):
+        '''Get number of bytes used by entry data
+        '''
+        return len(self.data) + (len(self.gzip_data) if self.gzip_data
+                                 else 0)
+
+
+class StaticCache(object):
+    '''In-memory cache for static files with least recently used entries
+    eviction when cached data exceeds the memory budget
+    '''
+
+    def __init__(self, max_size, max_file_size=MAX_CACHED_FILE_SIZE):
+        '''Create new cache
+
+        Args:
+            max_size - maximum number of bytes used by cached files
+            max_file_size - files larger than this size are not cached
+        '''
+        super(StaticCache, self).__init__()
+        self.max_size = max_size
+        self.max_file_size = min(max_file_size, max_size)
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, file_path, stat):
+        '''Get cached file or read it and put into the cache
+
+        Returns:
+            StaticEntry or None if file could not be cached
+        '''
+        with self.lock:
+            entry = self.entries.pop(file_path, None)
+            if entry is not None:
+                if entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                    self.entries[file_path] = entry
+                    return entry
+                self.size -= entry.get_memory_size()
+        if stat.st_size > self.max_file_size:
+            return None
+        entry = StaticEntry(file_path, stat)
+        with self.lock:
+            previous = self.entries.pop(file_path, None)
+            if previous is not None:
+                self.size -= previous.get_memory_size()
+            self.entries[file_path] = entry
+            self.size += entry.get_memory_size()
+            while self.size > self.max_size and self.entries:
+                _, removed = self.entries.popitem(last=False)
+                self.size -= removed.get_memory_size()
+        return entry
+
+
+static_cache = None
+'''Static cache instance created on first request if enabled in settings or
+False if it's disabled'''
+
+
+def get_static_cache(settings):
+    '''Get static cache if it's enabled in settings
+    '''
+    global static_cache
+    if static_cache is None:
+        try:
+            static_cache = StaticCache(int(settings['static_cache_size']))
+        except KeyError:
+            static_cache = False
+    return static_cache or None
+
+
+def get_content_type(file_path):
+    '''Get content type for file
+    '''
+    content_type, _ = mimetypes.guess_type(file_path)
+    return content_type or 'text/html'
+
+
+def accepts_gzip(environ):
+    '''Check is client accepts gzip content encoding
+    '''
+    encodings = get_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+    return encodings.get('gzip', encodings.get('*', 0)) > 0
+
+
+def get_etag(stat, encoding=None):
+    '''Get entity tag for file stat and content encoding
+    '''
+    return '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size,
+                          '-' + encoding if encoding else '')
+
+
+def parse_date(value):
+    '''Parse HTTP date
+
+    Returns:
+        timestamp or None if date could not be parsed
+    '''
+    try:
+        return email.utils.mktime_tz(email.utils.parsedate_tz(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def is_not_modified(environ, etag, mtime):
+    '''Check conditional request headers
+    '''
+    if 'HTTP_IF_NONE_MATCH' in environ:
+        tags = [tag.strip()
+                for tag in environ['HTTP_IF_NONE_MATCH'].split(',')]
+        return '*' in tags or etag in tags
+    if 'HTTP_IF_MODIFIED_SINCE' in environ:
+        since = parse_date(environ['HTTP_IF_MODIFIED_SINCE'])
+        return since is not None and mtime <= since
+    return False
+
+
+def parse_range(value, size):
+    '''Parse Range header value. Only single byte range supported
+
+    Returns:
+        tuple (start, end) with inclusive end, False if range could not be
+        satisfied or None if range should be ignored
+    '''
+    unit, _, ranges = value.partition('=')
+    if unit.strip() != 'bytes' or ',' in ranges:
+        return None
+    start, _, end = ranges.strip().partition('-')
+    try:
+        if not start:
+            # Suffix range, e.g. last 500 bytes: bytes=-500
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
 
 def static_view(request, path=None):
     '''Serve static files
     '''
-    # Get static_root 
+    # Get static_root
     settings = request.app.settings
     static_url = (settings.static_url if settings.static_url.endswith('/')
                   else settings.static_url + '/')
@@ -21,20 +219,73 @@ def static_view(request, path=None):
         url = request.meta['HTTP_HOST'] + request.path
         if not url.startswith(static_url):
             return http.Response('%s was not found' % url, 404)
-        file_path = os.path.join(static_root, url.replace(static_url, ''))
+        path = url.replace(static_url, '')
+    file_path = os.path.realpath(os.path.join(static_root, path))
+    if (not file_path.startswith(static_root + os.sep) or
+            not os.path.isfile(file_path)):
+        return http.Response('%s was not found' % path, 404)
+    # Check conditional request headers
+    environ = request.meta
+    stat = os.stat(file_path)
+    cache = get_static_cache(settings)
+    entry = cache.get(file_path, stat) if cache is not None else None
+    compressed = (entry is not None and entry.gzip_data is not None and
+                  'HTTP_RANGE' not in environ and accepts_gzip(environ))
+    if compressed:
+        etag, last_modified = get_etag(stat, 'gzip'), entry.last_modified
+    elif entry is not None:
+        etag, last_modified = entry.etag, entry.last_modified
+    else:
+        etag = get_etag(stat)
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+    headers = [('ETag', etag), ('Last-Modified', last_modified)]
+    if entry is not None and entry.gzip_data is not None:
+        headers.append(('Vary', 'Accept-Encoding'))
+    if is_not_modified(environ, etag, int(stat.st_mtime)):
+        return http.Response('', 304, headers)
+    headers.append(('Content-Type', entry.content_type if entry is not None
+                                    else get_content_type(file_path)))
+    headers.append(('Accept-Ranges', 'bytes'))
+    # Check range requested
+    size = stat.st_size
+    byte_range = None
+    if 'HTTP_RANGE' in environ and (
+            environ.get('HTTP_IF_RANGE', etag) in (etag, last_modified)):
+        byte_range = parse_range(environ['HTTP_RANGE'], size)
+    if byte_range is False:
+        headers.append(('Content-Range', 'bytes */%d' % size))
+        return http.Response('', 416, headers)
+    if entry is not None:
+        return get_cached_response(entry, headers, byte_range, compressed)
+    file = open(file_path, 'rb')
+    if byte_range is None:
+        headers.append(('Content-Length', str(size)))
+        return http.FileResponse(file, 200, headers)
+    start, end = byte_range
+    headers.append(('Content-Range', 'bytes %d-%d/%d' % (start, end, size)))
+    headers.append(('Content-Length', str(end - start + 1)))
+    return http.FileResponse(file, 206, headers, start,
+                             None if end == size - 1 else end - start + 1)
+
+
+def get_cached_response(entry, headers, byte_range, compressed):
+    '''Create response for file cached in memory
+    '''
+    if byte_range is not None:
+        start, end = byte_range
+        headers.append(('Content-Range', 'bytes %d-%d/%d' % (start, end,
+                                                            entry.size)))
+        data = entry.data[start:end + 1]
+        code = 206
+    elif compressed:
+        headers.append(('Content-Encoding', 'gzip'))
+        data = entry.gzip_data
+        code = 200
     else:
-        file_path = os.path.join(static_root, path)
-    # Try to open and read file
-    with open(file_path, 'rb') as file:
-        result = "".join(file.readlines())
-        headers = None
-        if '.' in file_path:
-            _, ext = os.path.splitext(file_path)
-            if ext in mimetypes.types_map:
-                headers = [('Content-Type', mimetypes.types_map[ext])]
-        if not headers:
-            headers = [('Content-Type', 'text/html')]
-        return http.Response(result, 200, headers)
+        data = entry.data
+        code = 200
+    headers.append(('Content-Length', str(len(data))))
+    return http.Response(data, code, headers)
 
 
 static_patterns = (
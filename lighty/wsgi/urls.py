@@ -22,6 +22,12 @@ TYPE_PATTERNS = {
 TO_ESCAPE = ('.', '\\', '[', ']', '(', ')', '+', '*', '?', '{', '}', '-', '|')
 ESCAPE_SYMBOL = lambda value, symbol: value.replace(symbol, '\\' + symbol)
 HTTP_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'UPDATE']
+SPECIAL_SYMBOLS = frozenset('\\.^$*+?{}[]|()')
+GROUP_NAME_PATTERN = re.compile('\\(\\?P([<=])([\\w]+)([>)])')
+INLINE_FLAGS_PATTERN = re.compile('\\(\\?[aiLmsux]')
+MAX_GROUPS = 99
+'''Maximum number of groups in single combined regular expression. Older
+python versions does not support more than 100 groups in one expression'''
 
 
 def load_urls(name):
@@ -73,15 +79,17 @@ def get_arg(pattern, constr):
             constr[name] if name in constr else TYPE_PATTERNS[type_name])
 
 
-def replace_pattern(string, (pattern, name, regexp)):
+def replace_pattern(string, variable):
     '''Replace a pattern in string
     '''
+    pattern, name, regexp = variable
     return string.replace(pattern, '(?P<%s>%s)' % (name, regexp))
 
 
-def replace_arg(string, (pattern, value)):
+def replace_arg(string, replacement):
     '''Replace an argument in string
     '''
+    pattern, value = replacement
     return string.replace(pattern, str(value))
 
 
@@ -98,7 +106,7 @@ def url(pattern, view, name='', **kwargs):
     url_expr = re.compile(functools.reduce(replace_pattern,
                                            [pattern + '$'] + variables))
     view_func = load_view(view)
-    url_name = name is not '' and name or view_func
+    url_name = name != '' and name or view_func
     return (url_expr, pattern, view_func, url_name, defaults, args, constrs,
             methods)
 
@@ -129,3 +137,207 @@ def reverse(urls, lookup_name, lookup_args=None):
     return NoneMonad(LookupError(
                             'Url for name "%s" with args "%s" was not found' %
                             (lookup_name, ','.join(lookup_keys))))
+
+
+def get_literal_prefix(regexp):
+    '''Get the part of regular expression before the first special symbol
+    '''
+    for index, symbol in enumerate(regexp):
+        if symbol in SPECIAL_SYMBOLS:
+            # Quantifier makes the previous symbol optional
+            return regexp[:index - 1 if symbol in '?*+{' else index]
+    return regexp
+
+
+def get_segment(path):
+    '''Get first segment of the path, e.g. 'blog' for '/blog/12/'
+    '''
+    return path.split('/', 2)[1] if path.startswith('/') else None
+
+
+class Dispatcher(object):
+    '''Url dispatcher resolves the path without scanning all the url patterns
+    one by one. For each HTTP method dispatcher builds the table contains:
+
+    - dictionary for static urls (patterns without any regular expression
+      symbols), so static paths are resolved with single dictionary lookup
+    - prefix table maps first path segment to the patterns could match paths
+      starts with this segment
+    - combined regular expressions for other patterns. Patterns are joined
+      into one alternation with renamed groups, so single match call checks
+      many patterns at once
+
+    Patterns order is preserved: if few patterns match the path the first one
+    is used as it does :func:`resolve`. Tables are built on the first request
+    with each HTTP method::
+
+        dispatcher = Dispatcher(load_urls('app.urls'))
+        view = dispatcher.resolve('/blog/12/', 'GET')
+
+    Dispatcher also keeps the index maps url name and arguments names to the
+    format string, so url reversing is a dictionary lookup and formatting::
+
+        dispatcher.reverse('blog_post', {'id': 12})  # returns '/blog/12/'
+    '''
+
+    def __init__(self, urls):
+        '''Create new dispatcher for url patterns specified
+        '''
+        super(Dispatcher, self).__init__()
+        self.urls = urls
+        self.tables = {}
+        self.names = None
+
+    def get_names(self):
+        '''Get index for url reversing or build it if needed
+
+        Returns:
+            dictionary maps tuple (name, frozenset of arguments names) to the
+            format string for url
+        '''
+        if self.names is None:
+            names = {}
+            for _, pattern, _, name, _, args, _, _ in self.urls:
+                key = (name, frozenset(args))
+                if key not in names:
+                    template = pattern.replace('%', '%%')
+                    for var in args:
+                        template = template.replace(args[var], '%%(%s)s' % var)
+                    names[key] = template
+            self.names = names
+        return self.names
+
+    def reverse(self, name, args=None):
+        '''Get url for name with specified args. See :func:`reverse`
+        '''
+        names = self.get_names()
+        key = (name, frozenset(args) if args else frozenset())
+        if key in names:
+            return names[key] % (args or {})
+        return NoneMonad(LookupError(
+                            'Url for name "%s" with args "%s" was not found' %
+                            (name, ','.join(sorted(args.keys()) if args
+                                            else []))))
+
+    def get_table(self, method):
+        '''Get dispatching table for method or build it if needed
+
+        Returns:
+            tuple (static, first_dynamic, prefixes, other) where static is
+            dictionary maps path to pattern index and prepared view, and
+            prefixes is dictionary maps first path segment to the list of
+            matchers, other is list of matchers for paths with another first
+            segment
+        '''
+        if method in self.tables:
+            return self.tables[method]
+        static = {}
+        routes = []
+        for index, url in enumerate(self.urls):
+            expr, _, view, _, defaults, _, _, methods = url
+            if method and method not in methods:
+                continue
+            regexp = expr.pattern
+            prefix = get_literal_prefix(regexp)
+            if prefix == regexp[:-1] and regexp.endswith('$'):
+                if prefix not in static:
+                    static[prefix] = (index, functools.partial(view,
+                                                               **defaults))
+                continue
+            segment = get_segment(prefix)
+            if prefix.find('/', 1) < 0 or '|' in regexp:
+                # First segment is not finished in literal prefix or pattern
+                # has alternatives
+                segment = None
+            routes.append((index, segment, expr, view, defaults))
+        first_dynamic = routes[0][0] if routes else len(self.urls)
+        segments = set([route[1] for route in routes if route[1] is not None])
+        prefixes = dict([(segment, self.build_matchers(
+                                [route for route in routes
+                                 if route[1] in (segment, None)]))
+                         for segment in segments])
+        other = self.build_matchers([route for route in routes
+                                     if route[1] is None])
+        self.tables[method] = (static, first_dynamic, prefixes, other)
+        return self.tables[method]
+
+    @staticmethod
+    def build_matchers(routes):
+        '''Combine routes into the list of matchers
+
+        Returns:
+            list of tuples (regular expression, routes) where routes is
+            dictionary maps outer group name to the tuple (index, view,
+            defaults, groups) or None if expression is the original pattern
+            expression
+        '''
+        matchers = []
+        parts = []
+        combined = {}
+        groups = 0
+        for index, _, expr, view, defaults in routes:
+            if INLINE_FLAGS_PATTERN.search(expr.pattern):
+                # Inline flags could not be used inside alternation
+                if parts:
+                    matchers.append((re.compile('|'.join(parts)), combined))
+                    parts, combined, groups = [], {}, 0
+                matchers.append((expr, (index, view, defaults)))
+                continue
+            if groups + expr.groups + 1 > MAX_GROUPS and parts:
+                matchers.append((re.compile('|'.join(parts)), combined))
+                parts, combined, groups = [], {}, 0
+            prefix = '_%d_' % index
+            parts.append('(?P<_%d>%s)' % (index, GROUP_NAME_PATTERN.sub(
+                            '(?P\\1%s\\2\\3' % prefix, expr.pattern)))
+            combined['_%d' % index] = (index, view, defaults, [
+                            (prefix + name, name) for name in expr.groupindex])
+            groups += expr.groups + 1
+        if parts:
+            matchers.append((re.compile('|'.join(parts)), combined))
+        return matchers
+
+    @staticmethod
+    def match(matchers, path):
+        '''Find first route matches the path
+
+        Returns:
+            tuple (index, view, arguments) or None
+        '''
+        for regexp, routes in matchers:
+            match = regexp.match(path)
+            if match is None:
+                continue
+            if isinstance(routes, tuple):
+                index, view, defaults = routes
+                args = match.groupdict()
+            else:
+                index, view, defaults, names = routes[match.lastgroup]
+                group = match.group
+                args = dict([(name, group(group_name))
+                             for group_name, name in names])
+            if defaults:
+                call_args = dict(defaults)
+                call_args.update(args)
+                args = call_args
+            return index, view, args
+        return None
+
+    def resolve(self, path, method=None):
+        '''Resolve url for path and method name. See :func:`resolve`
+        '''
+        static, first_dynamic, prefixes, other = self.get_table(method)
+        if path in static:
+            index, view = static[path]
+            if index < first_dynamic:
+                return view
+        else:
+            index = None
+        segment = get_segment(path)
+        found = self.match(prefixes[segment] if segment in prefixes
+                           else other, path)
+        if found is not None and (index is None or found[0] < index):
+            return functools.partial(found[1], **found[2])
+        if index is not None:
+            return view
+        return NoneMonad(LookupError('There is no pattern matching path %s' %
+                                     path))
@@ -4,6 +4,7 @@ tests = (
     'command',
     'monad',
     'optparse',
+    'cache',
     'signals',
     'validators',
     # db
@@ -11,16 +12,23 @@ tests = (
     'mongo',
     # templates
     'parse_token',
+    'lexer',
     'variable_fields',
     'template',
+    'compiler',
 #    'partial',
     'loaders',
     'filters',
     'default_filters',
     'blockextend',
     'default_tags',
+    'stream',
     # wsgi
     'wsgiapps',
     'request',
+    'static',
+    'middleware',
+    'aioserver',
+    'prefork',
     'urls',
 )
@@ -0,0 +1,224 @@
+'''Test case for asyncio HTTP server
+'''
+import socket
+import sys
+import threading
+import time
+import unittest
+
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from lighty.wsgi.aioserver import HTTPProtocol
+except ImportError:
+    # Server requires python 3.4 or later
+    HTTPProtocol = None
+
+
+class Loop(object):
+    '''Event loop executes callbacks immediately and keeps executor tasks
+    until they are completed by test
+    '''
+
+    def __init__(self):
+        self.futures = []
+
+    def call_soon_threadsafe(self, callback, *args):
+        callback(*args)
+
+    def call_later(self, delay, callback):
+        return Handle()
+
+    def run_in_executor(self, executor, function, *args):
+        future = Future(function(*args))
+        self.futures.append(future)
+        return future
+
+    def complete(self):
+        '''Run done callback for the first executor task
+        '''
+        future = self.futures.pop(0)
+        future.callback(future)
+
+
+class Future(object):
+    '''Completed executor task
+    '''
+
+    def __init__(self, value):
+        self.value = value
+        self.callback = None
+
+    def add_done_callback(self, callback):
+        self.callback = callback
+
+    def exception(self):
+        return None
+
+    def result(self):
+        return self.value
+
+
+class Handle(object):
+    '''Timer handle does nothing
+    '''
+
+    def cancel(self):
+        pass
+
+
+class Transport(object):
+    '''Transport collects written data
+    '''
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+        self.reading = True
+
+    def pause_reading(self):
+        self.reading = False
+
+    def resume_reading(self):
+        self.reading = True
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        self.closed = True
+
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 12345)
+
+
+def slow_application(environ, start_response):
+    '''Application sends path by parts
+    '''
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    for part in (environ['PATH_INFO'], environ['PATH_INFO']):
+        time.sleep(0.05)
+        yield part.encode('latin-1')
+
+
+def make_application(status, headers, body):
+    '''Create WSGI application returns response specified
+    '''
+    def application(environ, start_response):
+        start_response(status, headers)
+        return [body]
+    return application
+
+
+class AsyncioServerTestCase(unittest.TestCase):
+    '''Test case for HTTP protocol
+    '''
+
+    def execute(self, application, method='GET'):
+        protocol = HTTPProtocol(application, None, Loop(), 8000)
+        protocol.connection_made(Transport())
+        environ = {'REQUEST_METHOD': method, 'SERVER_PROTOCOL': 'HTTP/1.1',
+                   'wsgi.errors': sys.stderr}
+        keep_alive = protocol.execute(environ, True)
+        return keep_alive, protocol.transport.data
+
+    def testParse(self):
+        '''Test pipelined requests parsing'''
+        protocol = HTTPProtocol(None, None, Loop(), 8000)
+        protocol.connection_made(Transport())
+        protocol.buffer = (b'POST /a?b=1 HTTP/1.1\r\nContent-Length: 2\r\n'
+                           b'\r\nokGET /c HTTP/1.0\r\n\r\n')
+        environ, keep_alive = protocol.parse_request()
+        assert environ['PATH_INFO'] == '/a' and keep_alive, (
+                'Wrong request: %s' % environ)
+        assert environ['wsgi.input'].read() == b'ok', 'Wrong request body'
+        environ, keep_alive = protocol.parse_request()
+        assert environ['PATH_INFO'] == '/c' and not keep_alive, (
+                'Wrong pipelined request: %s' % environ)
+        assert protocol.parse_request() is None, 'Request from empty buffer'
+
+    def testPauseReading(self):
+        '''Test reading paused while pipelined request is processed'''
+        loop = Loop()
+        protocol = HTTPProtocol(make_application('200 OK', [], b'ok'), None,
+                                loop, 8000)
+        protocol.connection_made(Transport())
+        protocol.data_received(b'GET /a HTTP/1.1\r\n\r\n'
+                               b'GET /b HTTP/1.1\r\n\r\n')
+        assert len(loop.futures) == 1, 'Pipelined requests were queued'
+        assert not protocol.transport.reading, 'Reading was not paused'
+        loop.complete()
+        assert len(loop.futures) == 1 and not protocol.buffer, (
+                'Next request was not processed')
+        assert not protocol.transport.reading, 'Reading was resumed'
+        loop.complete()
+        assert protocol.transport.reading, 'Reading was not resumed'
+
+    def testPipelinedError(self):
+        '''Test error response sent after pipelined responses'''
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(2)
+        server = loop.run_until_complete(loop.create_server(
+                lambda: HTTPProtocol(slow_application, executor, loop, 0),
+                '127.0.0.1', 0))
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            client = socket.create_connection(
+                                        server.sockets[0].getsockname())
+            client.sendall(b'GET /a HTTP/1.1\r\n\r\nGET /b HTTP/1.1\r\n\r\n'
+                           b'BROKEN\r\n\r\n')
+            data = b''
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            client.close()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            executor.shutdown()
+            loop.close()
+        responses = data.split(b'HTTP/1.1 ')
+        assert len(responses) == 4, 'Wrong responses: %s' % data
+        assert responses[1].endswith(b'\r\n\r\n2\r\n/a\r\n2\r\n/a\r\n'
+                                     b'0\r\n\r\n'), (
+                'Wrong first response: %s' % responses[1])
+        assert b'/b\r\n2\r\n/b' in responses[2], (
+                'Wrong second response: %s' % responses[2])
+        assert responses[3].startswith(b'400 Bad Request'), (
+                'Wrong error response: %s' % responses[3])
+
+    def testChunked(self):
+        '''Test response without length sent with chunked encoding'''
+        keep_alive, data = self.execute(make_application('200 OK', [],
+                                                         b'hello'))
+        assert keep_alive, 'Connection was not kept alive'
+        assert b'Transfer-Encoding: chunked' in data, (
+                'Response is not chunked: %s' % data)
+        assert data.endswith(b'\r\n\r\n5\r\nhello\r\n0\r\n\r\n'), (
+                'Wrong response body: %s' % data)
+
+    def testNoBody(self):
+        '''Test responses without body have no body framing'''
+        for status in ('304 Not Modified', '204 No Content'):
+            keep_alive, data = self.execute(make_application(status, [], b''))
+            assert keep_alive, 'Connection was not kept alive for %s' % status
+            assert b'Transfer-Encoding' not in data, (
+                    'Chunked encoding for %s: %s' % (status, data))
+            assert data.endswith(b'\r\n\r\n') and b'0\r\n' not in data, (
+                    'Body sent for %s: %s' % (status, data))
+
+
+def test():
+    suite = unittest.TestSuite()
+    if HTTPProtocol is not None:
+        suite.addTest(AsyncioServerTestCase('testParse'))
+        suite.addTest(AsyncioServerTestCase('testPauseReading'))
+        suite.addTest(AsyncioServerTestCase('testPipelinedError'))
+        suite.addTest(AsyncioServerTestCase('testChunked'))
+        suite.addTest(AsyncioServerTestCase('testNoBody'))
+    return suite
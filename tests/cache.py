@@ -0,0 +1,77 @@
+"""Test cases for cache backends and cache template tag
+"""
+import shutil
+import tempfile
+import time
+import unittest
+
+from lighty.cache import FileCache, MemoryCache, manager
+from lighty.templates import Template
+
+
+class CacheTestCase(unittest.TestCase):
+    """Test case for cache backends
+    """
+
+    def checkBackend(self, cache):
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value', 'Value was not cached'
+        cache.delete('key')
+        assert cache.get('key', 'none') == 'none', 'Value was not deleted'
+        cache.set('expired', 'value', 0.01)
+        time.sleep(0.02)
+        assert cache.get('expired') is None, 'Value was not expired'
+        cache.set('zero', 'value', 0)
+        assert cache.get('zero') is None, 'Value with zero ttl was stored'
+        cache.set(b'\xd0\xba\xd0\xbb\xd1\x8e\xd1\x87', 'value')
+        assert cache.get(b'\xd0\xba\xd0\xbb\xd1\x8e\xd1\x87') == 'value', (
+                'Value with non ASCII byte string key was not cached')
+
+    def testMemoryCache(self):
+        '''Test memory cache'''
+        self.checkBackend(MemoryCache())
+
+    def testLeastRecentlyUsed(self):
+        '''Test memory cache removes least recently used values'''
+        cache = MemoryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None, 'Least recently used was not removed'
+        assert cache.get('a') == 1 and cache.get('c') == 3, (
+                'Recently used values were removed')
+
+    def testFileCache(self):
+        '''Test file cache'''
+        cache_dir = tempfile.mkdtemp()
+        try:
+            self.checkBackend(FileCache(cache_dir))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def testCacheTag(self):
+        '''Test cache template tag'''
+        manager.get_cache().clear()
+        template = Template('{% cache "test" 60 user %}{{ user }}:{{ value }}'
+                            '{% endcache %}')
+        result = template({'user': 'John', 'value': 1})
+        assert result == 'John:1', 'Wrong cache tag result: %s' % result
+        result = template({'user': 'John', 'value': 2})
+        assert result == 'John:1', 'Result was not cached: %s' % result
+        result = template({'user': 'Peter', 'value': 2})
+        assert result == 'Peter:2', 'Cache does not vary on user: %s' % result
+        template = Template('{% cache "test" 60 first second %}{{ value }}'
+                            '{% endcache %}')
+        result = template({'first': 'a:b', 'second': 'c', 'value': 1})
+        result = template({'first': 'a', 'second': 'b:c', 'value': 2})
+        assert result == '2', 'Keys with separators collide: %s' % result
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(CacheTestCase('testMemoryCache'))
+    suite.addTest(CacheTestCase('testLeastRecentlyUsed'))
+    suite.addTest(CacheTestCase('testFileCache'))
+    suite.addTest(CacheTestCase('testCacheTag'))
+    return suite
@@ -17,6 +17,8 @@ class CommandsTestCase(unittest.TestCase):
         cmds = load_commands_from_app('lighty.wsgi')
         from lighty.wsgi import commands
         assert cmds == [('make_application', commands.make_application),
+                        ('run_asyncio', commands.run_asyncio),
+                        ('run_prefork', commands.run_prefork),
                         ('run_server', commands.run_server),
                         ('run_tornado', commands.run_tornado)], (
                                 'Error loading commands for '
@@ -29,9 +31,11 @@ class CommandsTestCase(unittest.TestCase):
         '''Test loading commands for few applications'''
         from lighty.commands import load_commands
         cmds = load_commands(['lighty.wsgi', 'tests'])
-        assert sorted(cmds.keys()) == ['make_application', 'run_server',
-                                       'run_tornado', 'test'], ('Error loading'
-                                ' commands for ["lighty.wsgi","tests"]:\n%s' % 
+        assert sorted(cmds.keys()) == ['make_application', 'run_asyncio',
+                                       'run_prefork', 'run_server',
+                                       'run_tornado', 'test'], (
+                                'Error loading commands for '
+                                '["lighty.wsgi","tests"]:\n%s' %
                                 sorted(cmds.keys()))
 
 
@@ -0,0 +1,79 @@
+"""Test cases for template compiler
+"""
+import unittest
+
+from lighty.templates import Template
+from lighty.templates.compiler import Block, compile_commands, optimize
+
+
+class CompilerTestCase(unittest.TestCase):
+    """Test case for template commands compilation
+    """
+
+    def assertResult(self, result, value):
+        assert result == value, 'Error compiled template execution: %s' % (
+                                ' '.join((result, 'except', value)))
+
+    def testConstants(self):
+        '''Test constants compilation'''
+        render = compile_commands([Template.constant('Hello, '),
+                                   Template.constant('world!')])
+        self.assertResult(render({}), 'Hello, world!')
+
+    def testVariables(self):
+        '''Test variables compilation'''
+        render = compile_commands([Template.constant('Hello, '),
+                                   Template.variable('user.name')])
+        assert "'user'" in render.source, 'Variable was not inlined'
+        self.assertResult(render({'user': {'name': 'Peter'}}), 'Hello, Peter')
+
+    def testCommands(self):
+        '''Test another commands compilation'''
+        render = compile_commands([lambda context: 'Hello, ',
+                                   lambda context: context['name']])
+        self.assertResult(render({'name': 'John'}), 'Hello, John')
+
+    def testBlock(self):
+        '''Test block compiles itself on call'''
+        block = Block([Template.constant('Hello, '),
+                       Template.variable('name')])
+        self.assertResult(block({'name': 'Harry'}), 'Hello, Harry')
+        assert block.render is not None, 'Block was not compiled'
+
+    def testTemplateCompilation(self):
+        '''Test template compiles itself on first execution'''
+        template = Template('{% for a in list %}{{ a }}{% endfor %}!')
+        assert template.render is None, 'Template compiled before execution'
+        self.assertResult(template({'list': [1, 2, 3]}), '123!')
+        assert template.render is not None, 'Template was not compiled'
+        template.parse('{{ a }}')
+        assert template.render is None, 'Template was not reset on parse'
+
+    def testOptimize(self):
+        '''Test constants merging and inner templates inlining'''
+        inner = Template('{{ b }}c')
+        commands = optimize([Template.constant('a'), Template.constant(''),
+                             inner, Template.constant('d')])
+        assert len(commands) == 3, 'Wrong optimized commands: %s' % commands
+        assert commands[0].constant_value == 'a', 'Constants merging error'
+        assert commands[2].constant_value == 'cd', 'Constants merging error'
+
+    def testConstantFilters(self):
+        '''Test filters applied to constants evaluated on parsing'''
+        template = Template('{{ "hello"|capfirst }} {{ 12.45|floatformat:1 }}')
+        for command in template.commands:
+            assert hasattr(command, 'constant_value'), (
+                    'Filter was not evaluated on parsing')
+        self.assertResult(template({}), 'Hello 12.4')
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(CompilerTestCase('testConstants'))
+    suite.addTest(CompilerTestCase('testVariables'))
+    suite.addTest(CompilerTestCase('testCommands'))
+    suite.addTest(CompilerTestCase('testBlock'))
+    suite.addTest(CompilerTestCase('testTemplateCompilation'))
+    suite.addTest(CompilerTestCase('testOptimize'))
+    suite.addTest(CompilerTestCase('testConstantFilters'))
+    return suite
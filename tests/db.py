@@ -1,7 +1,12 @@
 '''Test case for MongoDB database backend
 '''
+import os
+import re
 import unittest
 
+import bson
+import pymongo.errors
+
 from lighty.db import backend, fields, models
 
 
@@ -69,8 +74,394 @@ class DatastoreTestCase(unittest.TestCase):
             item.delete()
 
 
+class PagesDatastore(backend.Datastore):
+    '''Datastore returns endless sequence of items and records requested
+    limits
+    '''
+
+    def __init__(self, name):
+        super(PagesDatastore, self).__init__(name, name)
+        self.limits = []
+
+    def query(self, query, fields=None):
+        start = sum(self.limits)
+        self.limits.append(query.limit)
+        return [{'_id': key, 'name': str(key), 'age': key}
+                for key in range(start, start + query.limit)]
+
+
+class QueryTestCase(unittest.TestCase):
+    '''Test case for query compilation into filter documents
+    '''
+    class User(models.Model):
+        name = fields.CharField()
+        age = fields.IntegerField()
+
+    def build(self, query):
+        return backend.Datastore.build_query(query)[0]
+
+    def testCompile(self):
+        '''Test queries compiled into native operators'''
+        User = QueryTestCase.User
+        query = self.build(User.all().where((User.age > 17) &
+                                            (User.name == 'Peter')))
+        assert query == {'age': {'$gt': 17}, 'name': 'Peter'}, (
+                'Wrong filter: %s' % query)
+        query = self.build(User.all().where(User.age >= 17) |
+                           (User.age < 10))
+        assert query == {'$or': [{'age': {'$gte': 17}},
+                                 {'age': {'$lt': 10}}]}, (
+                'Wrong filter: %s' % query)
+        query = self.build(User.all().where(User.age > 17)
+                           .where(User.age <= 20))
+        assert query == {'$and': [{'age': {'$gt': 17}},
+                                  {'age': {'$lte': 20}}]}, (
+                'Wrong filter: %s' % query)
+        query = self.build(User.all().where(User.name.contains('ete')))
+        assert query == {'name': {'$regex': 'ete', '$options': 'i'}}, (
+                'Wrong filter: %s' % query)
+        query = self.build(User.all().where(User.name.contains('a.*(')))
+        assert query == {'name': {'$regex': re.escape('a.*('),
+                                  '$options': 'i'}}, (
+                'Wrong filter: %s' % query)
+
+    def testOrAll(self):
+        '''Test union with all the items selects all the items'''
+        User = QueryTestCase.User
+        query = self.build(User.all() | (User.age > 18))
+        assert query == {}, 'Wrong filter: %s' % query
+        query = self.build(User.all().where(User.age > 18) | User.all())
+        assert query == {}, 'Wrong filter: %s' % query
+        query = self.build(User.all().where(User.age > 18) | (User.age < 5))
+        assert query == {'$or': [{'age': {'$gt': 18}}, {'age': {'$lt': 5}}]}, (
+                'Wrong filter: %s' % query)
+
+    def testExclude(self):
+        '''Test excluding and negation'''
+        User = QueryTestCase.User
+        query = self.build(User.all().where(User.age > 17)
+                           .exclude(User.name == 'Peter'))
+        assert query == {'age': {'$gt': 17},
+                         '$nor': [{'name': 'Peter'}]}, (
+                'Wrong filter: %s' % query)
+        query = self.build(-User.all().where(User.age != 17))
+        assert query == {'$nor': [{'age': {'$ne': 17}}]}, (
+                'Wrong filter: %s' % query)
+
+    def testSlice(self):
+        '''Test slices are translated into offset and limit'''
+        User = QueryTestCase.User
+        query = User.all().where(User.age > 17)[10:30]
+        assert (query.offset, query.limit) == (10, 20), (
+                'Wrong slice: %s %s' % (query.offset, query.limit))
+        assert self.build(query) == {'age': {'$gt': 17}}, (
+                'Filter was lost on slicing')
+        query = query[5:]
+        assert (query.offset, query.limit) == (15, 15), (
+                'Wrong slice of slice: %s %s' % (query.offset, query.limit))
+        query = query[20:25]
+        assert query.limit == 0, 'Wrong slice limit: %s' % query.limit
+
+    def testAfter(self):
+        '''Test keyset pagination query'''
+        User = QueryTestCase.User
+        if 'default' not in backend.manager.datastores:
+            backend.manager.connect('default')
+        user = User(is_new=False, _id=1, name='Peter', age=18)
+        query = User.all().order_by(User.age).after(user)
+        expected = {'$or': [{'age': {'$gt': 18}},
+                            {'_id': {'$gt': 1}, 'age': 18}]}
+        assert self.build(query) == expected, (
+                'Wrong filter: %s' % self.build(query))
+
+    def testPages(self):
+        '''Test pages iteration respects query limit'''
+        class Item(models.Model):
+            _datastore_name = 'pages'
+            name = fields.CharField()
+            age = fields.IntegerField()
+
+        datastore = PagesDatastore('pages')
+        backend.manager.datastores['pages'] = datastore
+        try:
+            pages = list(Item.all()[:25].pages(10))
+        finally:
+            del backend.manager.datastores['pages']
+        assert [len(page) for page in pages] == [10, 10, 5], (
+                'Wrong pages: %s' % [len(page) for page in pages])
+        assert datastore.limits == [10, 10, 5], (
+                'Wrong limits requested: %s' % datastore.limits)
+
+    def testWhere(self):
+        '''Test $where fallback for arithmetic expressions'''
+        User = QueryTestCase.User
+        query = self.build(User.all().where(User.age + 1 > 18))
+        assert list(query.keys()) == ['$where'], 'Wrong filter: %s' % query
+
+
+class IndexTestCase(unittest.TestCase):
+    '''Test case for indexes declarations
+    '''
+
+    def testDeclaration(self):
+        '''Test indexes taken from fields options and _indexes'''
+        class Message(models.Model):
+            sender = fields.CharField(db_index=True)
+            code = fields.CharField(unique=True)
+            topic = fields.CharField()
+            text = fields.TextField()
+            _indexes = (('topic', '-sender'), )
+
+        indexes = dict([(index.keys, index.unique)
+                        for index in Message.indexes()])
+        assert indexes == {(('topic', 1), ('sender', -1)): False,
+                           (('sender', 1), ): False,
+                           (('code', 1), ): True}, (
+                'Wrong indexes: %s' % Message.indexes())
+        assert Message._unindexed_properties == frozenset(['text']), (
+                'Wrong unindexed fields: %s' % Message._unindexed_properties)
+        assert Message in models.registry, 'Model was not registered'
+
+    def testWarning(self):
+        '''Test warning for query on unindexed field'''
+        import warnings
+
+        class Note(models.Model):
+            title = fields.CharField(db_index=True)
+            text = fields.TextField()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            for _ in range(2):
+                backend.Datastore.check_indexes(Note, {'title': 'a',
+                        '$or': [{'text': 'b'}, {'title': 'c'}]})
+        assert len(caught) == 1, 'Wrong warnings: %s' % [
+                str(warning.message) for warning in caught]
+        assert 'Note.text' in str(caught[0].message), (
+                'Wrong warning: %s' % caught[0].message)
+        shape = ('Note', backend.get_filter_shape({'title': 'a',
+                        '$or': [{'text': 'b'}, {'title': 'c'}]}))
+        assert shape in backend.checked_filters, 'Filter was not cached'
+        assert (backend.get_filter_shape({'title': 'c', 'text': 'b'}) ==
+                backend.get_filter_shape({'text': 'd', 'title': 'e'})), (
+                'Filters with the same fields have different shapes')
+
+    def testSync(self):
+        '''Test missing indexes created and unique mismatch reported'''
+        class Account(models.Model):
+            login = fields.CharField(unique=True)
+            email = fields.CharField(db_index=True)
+            name = fields.CharField(db_index=True)
+
+        collection = IndexCollection({
+                '_id_': {'key': [('_id', 1)]},
+                'login_1': {'key': [('login', 1)]},
+                'email_1': {'key': [('email', 1.0)]}})
+        datastore = backend.Datastore('index', 'index')
+        datastore.pid = os.getpid()
+        datastore._db = {Account.entity_name(): collection}
+        created, mismatched = datastore.sync_indexes(Account)
+        assert [index.keys for index in created] == [(('name', 1), )], (
+                'Wrong created indexes: %s' % created)
+        assert collection.created == [([('name', 1)], False)], (
+                'Wrong indexes requested: %s' % collection.created)
+        assert [index.keys for index in mismatched] == [(('login', 1), )], (
+                'Unique mismatch was not reported: %s' % mismatched)
+
+    def testSyncCommand(self):
+        '''Test indexes synchronized only for applications models'''
+        from lighty.db.commands import sync_indexes
+
+        class Settings(object):
+            def section_options(self, section):
+                return ['lighty.db']
+
+        class Local(models.Model):
+            _datastore_name = 'sync'
+            name = fields.CharField(db_index=True)
+
+        class Declared(models.Model):
+            __module__ = 'lighty.db.models'
+            _datastore_name = 'sync'
+            name = fields.CharField(db_index=True)
+
+        collection = IndexCollection({})
+        datastore = backend.Datastore('sync', 'sync')
+        datastore.pid = os.getpid()
+        datastore._db = {Declared.entity_name(): collection}
+        backend.manager.datastores['sync'] = datastore
+        try:
+            sync_indexes(Settings())
+        finally:
+            del backend.manager.datastores['sync']
+        assert collection.created == [([('name', 1)], False)], (
+                'Wrong indexes created: %s' % collection.created)
+
+    def testDebug(self):
+        '''Test queries checked for indexes only in debug mode'''
+        from lighty.conf import Settings
+        from lighty.db import init_db_manager
+
+        class EmptySettings(dict):
+            def sections(self):
+                return []
+
+        try:
+            init_db_manager(Settings('tests/test.cfg'))
+            assert backend.check_unindexed, 'Check disabled in debug mode'
+            init_db_manager(EmptySettings())
+            assert not backend.check_unindexed, 'Check enabled without debug'
+        finally:
+            backend.check_unindexed = False
+
+
+class IndexCollection(object):
+    '''Collection with indexes information records created indexes
+    '''
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.created = []
+
+    def index_information(self):
+        return self.indexes
+
+    def create_index(self, keys, unique=False, background=False):
+        self.created.append((keys, unique))
+        return '_'.join(['%s_%s' % key for key in keys])
+
+
+class LegacyCollection(object):
+    '''Collection with old pymongo API records the requests
+    '''
+
+    def __init__(self):
+        self.requests = []
+
+    def insert(self, items, continue_on_error=False):
+        self.requests.append(('insert', len(items)))
+        for item in items:
+            item['_id'] = bson.objectid.ObjectId()
+
+    def save(self, item):
+        self.requests.append(('save', 1))
+        if item.get('name') == 'broken':
+            raise pymongo.errors.OperationFailure('Could not save item')
+
+    def update(self, document, update, multi=False):
+        return {'n': 3}
+
+
+class UpdateResult(object):
+    '''Result of update with modified items number less than matched
+    '''
+    matched_count = 3
+    modified_count = 1
+
+
+class Collection(object):
+    '''Collection with new pymongo API
+    '''
+
+    def update_many(self, document, update):
+        return UpdateResult()
+
+
+class BulkTestCase(unittest.TestCase):
+    '''Test case for bulk operations with different pymongo versions
+    '''
+    class Item(models.Model):
+        name = fields.CharField(db_index=True)
+
+    def get_datastore(self, collection):
+        datastore = backend.Datastore('bulk', 'bulk')
+        datastore.pid = os.getpid()
+        datastore._db = {BulkTestCase.Item.entity_name(): collection}
+        return datastore
+
+    def testLegacyBatches(self):
+        '''Test items sent by batches with old pymongo API'''
+        collection = LegacyCollection()
+        items = [{'name': str(i)} for i in range(5)]
+        items[1]['_id'] = bson.objectid.ObjectId()
+        keys = self.get_datastore(collection).put_many(BulkTestCase.Item,
+                                                       items, batch_size=3)
+        assert collection.requests == [('insert', 1), ('save', 1),
+                                       ('insert', 1), ('insert', 2)], (
+                'Items were not written in order: %s' % collection.requests)
+        assert len(set(keys)) == 5, 'Wrong keys: %s' % keys
+
+    def testLegacyErrors(self):
+        '''Test unordered writes continue after error with old pymongo API'''
+        items = [{'name': name, '_id': bson.objectid.ObjectId()}
+                 for name in ('a', 'broken', 'b')] + [{'name': 'c'}]
+        for ordered, requests in ((True, 2), (False, 4)):
+            collection = LegacyCollection()
+            datastore = self.get_datastore(collection)
+            self.assertRaises(pymongo.errors.OperationFailure,
+                              datastore.put_many, BulkTestCase.Item, items,
+                              ordered=ordered)
+            assert len(collection.requests) == requests, (
+                    'Wrong requests: %s' % collection.requests)
+
+    def testUpdateCount(self):
+        '''Test update returns matched items number for any pymongo API'''
+        query = BulkTestCase.Item.all().where(BulkTestCase.Item.name == 'a')
+        for collection in (LegacyCollection(), Collection()):
+            count = self.get_datastore(collection).update_many(query,
+                                                               {'name': 'b'})
+            assert count == 3, 'Wrong updated items number: %s' % count
+
+
+class ClientRegistryTestCase(unittest.TestCase):
+    '''Test case for shared clients registry
+    '''
+
+    def testOptions(self):
+        '''Test client options taken from datastore settings'''
+        host, port, options = backend.get_client_options({'port': '27018',
+                'max_pool_size': '10', 'connect_timeout': '500',
+                'db_name': 'test'})
+        assert (host, port) == ('localhost', 27018), (
+                'Wrong address: %s:%s' % (host, port))
+        assert options == {'maxPoolSize': 10, 'connectTimeoutMS': 500}, (
+                'Wrong client options: %s' % options)
+
+    def testShared(self):
+        '''Test clients are shared and recreated after fork'''
+        registry = backend.ClientRegistry()
+        client = registry.get_client('localhost', 27017, maxPoolSize=5)
+        assert registry.get_client('localhost', 27017,
+                                   maxPoolSize=5) is client, (
+                'Client was not shared')
+        assert registry.get_client('localhost', 27017) is not client, (
+                'Client with different options was shared')
+        registry.pid = -1
+        assert registry.get_client('localhost', 27017,
+                                   maxPoolSize=5) is not client, (
+                'Client was not recreated after fork')
+        registry.close()
+
+
 def test():
     suite = unittest.TestSuite()
     suite.addTest(ModelTestCase('testClassExtending'))
     suite.addTest(DatastoreTestCase('testBackendSwap'))
+    suite.addTest(QueryTestCase('testCompile'))
+    suite.addTest(QueryTestCase('testOrAll'))
+    suite.addTest(QueryTestCase('testExclude'))
+    suite.addTest(QueryTestCase('testSlice'))
+    suite.addTest(QueryTestCase('testAfter'))
+    suite.addTest(QueryTestCase('testPages'))
+    suite.addTest(QueryTestCase('testWhere'))
+    suite.addTest(IndexTestCase('testDeclaration'))
+    suite.addTest(IndexTestCase('testWarning'))
+    suite.addTest(IndexTestCase('testSync'))
+    suite.addTest(IndexTestCase('testSyncCommand'))
+    suite.addTest(IndexTestCase('testDebug'))
+    suite.addTest(BulkTestCase('testLegacyBatches'))
+    suite.addTest(BulkTestCase('testLegacyErrors'))
+    suite.addTest(BulkTestCase('testUpdateCount'))
+    suite.addTest(ClientRegistryTestCase('testOptions'))
+    suite.addTest(ClientRegistryTestCase('testShared'))
     return suite
@@ -50,6 +50,43 @@ class DefaultTagsTestCase(unittest.TestCase):
         result = template({'list': [1, 2, 3, 4, 5]})
         self.assertResult('for', result.strip(), '1 2 3 4 5')
 
+    def testGeneratorFor(self):
+        '''Test for template tag iterates over generator only once'''
+        template = Template()
+        template.parse('{% for a in list %}{% if forloop.first %}[{% endif %}'
+                       '{{ a }}{% if forloop.last %}]{% endif %}{% endfor %}')
+        context = {'list': (i for i in (1, 2, 3))}
+        result = template(context)
+        self.assertResult('for', result, '[123]')
+        assert 'a' not in context and 'forloop' not in context, (
+                'For tag changed parent context: %s' % context)
+
+    def testContextStack(self):
+        '''Test nested tags does not change context'''
+        template = Template('{% with a as b %}{% for a in list %}{{ a }}{{ b }}'
+                            '{% endfor %}{{ a }}{% endwith %}{{ b }}')
+        context = {'a': 'x', 'list': [1, 2]}
+        result = template(context)
+        self.assertResult('with', result, '1x2xxNone')
+        assert context == {'a': 'x', 'list': [1, 2]}, (
+                'Tags changed context: %s' % context)
+
+    def testContextLayers(self):
+        '''Test variables set in layer are removed with the layer'''
+        from lighty.templates.context import ContextStack
+        stack = ContextStack({'a': 1, 'b': 2})
+        stack.push({'b': 3})
+        stack['a'] = 4
+        stack['c'] = 5
+        assert sorted(stack.items()) == [('a', 4), ('b', 3), ('c', 5)], (
+                'Wrong stack items: %s' % sorted(stack.items()))
+        stack.pop()
+        assert sorted(stack.items()) == [('a', 1), ('b', 2)], (
+                'Variables set in layer were not removed: %s' %
+                sorted(stack.items()))
+        assert len(stack) == 2 and sorted(stack) == ['a', 'b'], (
+                'Base context variables were not counted: %s' % stack.keys())
+
     def testSimpleInclude(self):
         '''Test include template tag'''
         template = Template('{% include "simple.html" %}', name="test.html",
@@ -64,5 +101,8 @@ def test():
     suite.addTest(DefaultTagsTestCase('testSimpleWith'))
     suite.addTest(DefaultTagsTestCase('testSimpleIf'))
     suite.addTest(DefaultTagsTestCase('testSimpleFor'))
+    suite.addTest(DefaultTagsTestCase('testGeneratorFor'))
+    suite.addTest(DefaultTagsTestCase('testContextStack'))
+    suite.addTest(DefaultTagsTestCase('testContextLayers'))
     suite.addTest(DefaultTagsTestCase('testSimpleInclude'))
     return suite
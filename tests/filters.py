@@ -83,6 +83,23 @@ class TemplateFiltersTestCase(unittest.TestCase):
         })
         self.assertResult(result, 'Hello, world')
 
+    def testColonArgFilter(self):
+        '''Test calling filter with argument contains colon'''
+        colon_template = Template(name='colon-filter.html')
+        colon_template.parse('{{ simple_var|argument_filter:"12:30" }}')
+        result = colon_template.execute({'simple_var': 'Time'})
+        self.assertResult(result, 'Time, 12:30')
+
+    def testUnknownFilter(self):
+        '''Test unknown filter raises an exception on parsing'''
+        unknown_template = Template(name='unknown-filter.html')
+        try:
+            unknown_template.parse('{{ simple_var|not_registered_filter }}')
+        except Exception:
+            pass
+        else:
+            assert False, 'No exception for unknown filter on parsing'
+
 
 def test():
     suite = unittest.TestSuite()
@@ -93,4 +110,6 @@ def test():
     suite.addTest(TemplateFiltersTestCase('testMultiargFilter'))
     suite.addTest(TemplateFiltersTestCase('testMultiFilter'))
     suite.addTest(TemplateFiltersTestCase('testVaribaleArgFilter'))
+    suite.addTest(TemplateFiltersTestCase('testColonArgFilter'))
+    suite.addTest(TemplateFiltersTestCase('testUnknownFilter'))
     return suite
@@ -0,0 +1,57 @@
+"""Test cases for template lexer
+"""
+import unittest
+
+from lighty.templates.lexer import ECHO, TAG, TEXT, tokenize
+
+
+class LexerTestCase(unittest.TestCase):
+    """Test case for template text tokenizing
+    """
+
+    def assertTokens(self, text, tokens):
+        result = list(tokenize(text))
+        assert result == tokens, 'Wrong tokens for "%s": %s except %s' % (
+                                 text, result, tokens)
+
+    def testText(self):
+        '''Test plain text tokenizing'''
+        self.assertTokens('Hello {world}', [(TEXT, 'Hello {world}', 1, 1)])
+
+    def testEcho(self):
+        '''Test variables and filters tokenizing'''
+        self.assertTokens('Hello, {{ name }}{{ a|upper }}!', [
+                (TEXT, 'Hello, ', 1, 1), (ECHO, 'name', 1, 8),
+                (ECHO, 'a|upper', 1, 18), (TEXT, '!', 1, 31)])
+
+    def testTags(self):
+        '''Test tags tokenizing with positions on few lines'''
+        self.assertTokens('a\n{% if b %}\n  {{ c }}{% endif %}', [
+                (TEXT, 'a\n', 1, 1), (TAG, 'if b', 2, 1),
+                (TEXT, '\n  ', 2, 11), (ECHO, 'c', 3, 3),
+                (TAG, 'endif', 3, 10)])
+
+    def testIterable(self):
+        '''Test tokenizing an iterable over the template lines'''
+        self.assertTokens(iter(['a\n', '{{ b }}']), [(TEXT, 'a\n', 1, 1),
+                                                    (ECHO, 'b', 2, 1)])
+
+    def testUnclosed(self):
+        '''Test error on unclosed tags'''
+        for text in ('{{ a', 'a\n{% if b }', '{{ a }b }}'):
+            try:
+                list(tokenize(text))
+            except Exception:
+                pass
+            else:
+                assert False, 'No error for unclosed tag: %s' % text
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(LexerTestCase('testText'))
+    suite.addTest(LexerTestCase('testEcho'))
+    suite.addTest(LexerTestCase('testTags'))
+    suite.addTest(LexerTestCase('testIterable'))
+    suite.addTest(LexerTestCase('testUnclosed'))
+    return suite
@@ -1,8 +1,11 @@
 """Test cases for block and extend template tags
 """
+import os
+import shutil
+import tempfile
 import unittest
 
-from lighty.templates.loaders import FSLoader
+from lighty.templates.loaders import FSLoader, TemplateCache
 
 from .blockextend import fuzzy_equals
 
@@ -42,6 +45,16 @@ class BlockTestCase(unittest.TestCase):
         assert is_eq, "Error template execution:\n%s" % (
                       "\n".join((result, "except", BASE_RESULT)))
 
+    def testPrepare(self):
+        '''Test all the templates parsed on loader preparation'''
+        loader = FSLoader(['tests/templates'])
+        loader.prepare()
+        template = loader.get_template('index.html')
+        assert 'execute' in template.__dict__, 'Template was not parsed'
+        result = template()
+        assert fuzzy_equals(result, EXTEND_RESULT), (
+                'Error prepared template execution:\n%s' % result)
+
 
 class ExtendTestCase(BlockTestCase):
     """Test case for extend template tag
@@ -59,8 +72,43 @@ class ExtendTestCase(BlockTestCase):
                       "\n".join((result, "except", EXTEND_RESULT)))
 
 
+class TemplateCacheTestCase(unittest.TestCase):
+    """Test case for on-disk tokenized templates cache
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.loader = FSLoader(['tests/templates'], self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testStoreTokens(self):
+        '''Test tokens stored into cache on template loading'''
+        result = self.loader.get_template('index.html')()
+        is_eq = fuzzy_equals(result, EXTEND_RESULT)
+        assert is_eq, "Error template execution:\n%s" % (
+                      "\n".join((result, "except", EXTEND_RESULT)))
+        cache = TemplateCache(self.cache_dir)
+        for name in ('index.html', 'base.html'):
+            tokens = cache.load(os.path.join('tests/templates', name))
+            assert tokens, 'Tokens for "%s" was not cached' % name
+
+    def testLoadTokens(self):
+        '''Test template loaded from cache'''
+        cache = TemplateCache(self.cache_dir)
+        file_path = os.path.join('tests/templates', 'simple.html')
+        cache.store(file_path, [(1, 'Cached', 1, 1)])
+        result = self.loader.get_template('simple.html')({'name': 'Peter'})
+        assert result == 'Cached', 'Template was not loaded from cache: %s' % (
+                                   result, )
+
+
 def test():
     suite = unittest.TestSuite()
     suite.addTest(BlockTestCase('testExecuteTemplate'))
+    suite.addTest(BlockTestCase('testPrepare'))
     suite.addTest(ExtendTestCase("testExecuteTemplate"))
+    suite.addTest(TemplateCacheTestCase('testStoreTokens'))
+    suite.addTest(TemplateCacheTestCase('testLoadTokens'))
     return suite
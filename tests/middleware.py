@@ -0,0 +1,118 @@
+'''Test case for middleware and response compression
+'''
+import unittest
+import zlib
+
+from lighty.conf import Settings
+from lighty.wsgi.middleware import (GzipMiddleware, choose_encoding,
+                                    wrap_application)
+
+PAGE = ''.join(['<p>Paragraph %d</p>' % i for i in range(100)])
+
+
+def application(environ, start_response):
+    '''Simple WSGI application returns page by parts
+    '''
+    start_response('200 OK', [('Content-Type', environ['CONTENT_TYPE'])])
+    return (PAGE[i:i + 100] for i in range(0, len(PAGE), 100))
+
+
+class TaggingMiddleware(object):
+    '''Middleware adds environment variable
+    '''
+
+    def __init__(self, application, settings):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        environ['CONTENT_TYPE'] = 'text/plain'
+        return self.application(environ, start_response)
+
+
+class MiddlewareTestCase(unittest.TestCase):
+    '''Test case for gzip middleware
+    '''
+
+    def request(self, accept_encoding, content_type='text/html',
+                settings=None):
+        middleware = GzipMiddleware(application, settings or {})
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['headers'] = dict(headers)
+        environ = {'REQUEST_METHOD': 'GET', 'CONTENT_TYPE': content_type,
+                   'HTTP_ACCEPT_ENCODING': accept_encoding}
+        chunks = list(middleware(environ, start_response))
+        return result['headers'], chunks
+
+    def testChooseEncoding(self):
+        '''Test content coding chosen for Accept-Encoding header'''
+        assert choose_encoding('gzip, deflate') == 'gzip', 'gzip expected'
+        assert choose_encoding('gzip;q=0.5, deflate') == 'deflate', (
+                'deflate expected')
+        assert choose_encoding('gzip;q=0, identity') is None, (
+                'No compression expected')
+        assert choose_encoding('*') == 'gzip', 'gzip expected for *'
+
+    def testGzip(self):
+        '''Test response is compressed by parts'''
+        headers, chunks = self.request('gzip')
+        assert headers['Content-Encoding'] == 'gzip', (
+                'Wrong content encoding: %s' % headers)
+        assert len(chunks) > 1, 'Streaming response was sent as one part'
+        data = zlib.decompress(b''.join(chunks), 16 + zlib.MAX_WBITS)
+        assert data == PAGE.encode('utf-8'), 'Wrong decompressed data'
+
+    def testDeflate(self):
+        '''Test deflate compression'''
+        headers, chunks = self.request('deflate')
+        assert headers['Content-Encoding'] == 'deflate', (
+                'Wrong content encoding: %s' % headers)
+        data = zlib.decompress(b''.join(chunks))
+        assert data == PAGE.encode('utf-8'), 'Wrong decompressed data'
+
+    def testSkip(self):
+        '''Test compressed and small responses are not compressed'''
+        headers, chunks = self.request('gzip', 'image/png')
+        assert 'Content-Encoding' not in headers, 'Image was compressed'
+        headers, chunks = self.request('gzip', settings={
+                                       'gzip_min_size': len(PAGE) + 1})
+        assert 'Content-Encoding' not in headers, (
+                'Small response was compressed')
+        assert b''.join(chunks) == PAGE.encode('utf-8'), 'Wrong response'
+
+    def testChain(self):
+        '''Test middleware chain loading from settings'''
+        app = wrap_application(application, {'middleware':
+                'lighty.wsgi.middleware.GzipMiddleware\n'
+                'tests.middleware.TaggingMiddleware'})
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result.update(headers)
+        list(app({'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': 'gzip'},
+                 start_response))
+        assert result['Content-Type'] == 'text/plain', (
+                'Inner middleware was not applied')
+        assert result['Content-Encoding'] == 'gzip', (
+                'Outer middleware was not applied')
+
+    def testSettings(self):
+        '''Test middleware options read from configuration'''
+        settings = Settings('tests/test.cfg')
+        assert wrap_application(application, settings) is application, (
+                'Application was wrapped without middleware in settings')
+        middleware = GzipMiddleware(application, settings)
+        assert middleware.min_size == 200, (
+                'Wrong default minimum size: %s' % middleware.min_size)
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(MiddlewareTestCase('testChooseEncoding'))
+    suite.addTest(MiddlewareTestCase('testGzip'))
+    suite.addTest(MiddlewareTestCase('testDeflate'))
+    suite.addTest(MiddlewareTestCase('testSkip'))
+    suite.addTest(MiddlewareTestCase('testChain'))
+    suite.addTest(MiddlewareTestCase('testSettings'))
+    return suite
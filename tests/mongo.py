@@ -195,6 +195,23 @@ class MongoTestCase(unittest.TestCase):
         assert isinstance(updated[0].changed, datetime), (
                 'Wrong resut item field type: %s' % type(updated[0].changed))
 
+    def testBulk(self):
+        '''Test bulk insert, update and delete
+        '''
+        users = User.put_many([User(name='User%d' % i, age=i)
+                               for i in range(10)], batch_size=3)
+        assert all([user.is_saved() for user in users]), (
+                'Keys were not set for saved instances')
+        assert len(User.all()) == 13, 'Wrong number of items: %d' % len(
+                User.all())
+        updated = User.all().where(User.age < 5).update(age=5)
+        assert updated == 5, 'Wrong number of updated items: %s' % updated
+        assert len(User.all().where(User.age == 5)) == 6, (
+                'Items were not updated')
+        deleted = User.all().where(User.age <= 5).delete()
+        assert deleted == 6, 'Wrong number of deleted items: %s' % deleted
+        assert len(User.all()) == 7, 'Items were not deleted'
+
 
 def test():
     suite = unittest.TestSuite()
@@ -211,4 +228,5 @@ def test():
     suite.addTest(MongoTestCase('testContains'))
     suite.addTest(MongoTestCase('testDelete'))
     suite.addTest(MongoTestCase('testDateTime'))
+    suite.addTest(MongoTestCase('testBulk'))
     return suite
@@ -0,0 +1,142 @@
+'''Test case for pre-fork server
+'''
+import os
+import signal
+import socket
+import threading
+import time
+import unittest
+
+from lighty.signals import dispatcher
+from lighty.wsgi import prefork
+
+
+def application(environ, start_response):
+    '''Application returns process id
+    '''
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [str(os.getpid()).encode('ascii')]
+
+
+def get(address):
+    '''Make request and get response body
+    '''
+    client = socket.create_connection(address)
+    client.sendall(b'GET / HTTP/1.0\r\n\r\n')
+    data = b''
+    while True:
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    client.close()
+    return data.split(b'\r\n\r\n', 1)[1]
+
+
+class PreforkTestCase(unittest.TestCase):
+    '''Test case for pre-fork server workers
+    '''
+
+    def setUp(self):
+        self.listener = prefork.create_socket('127.0.0.1', 0)
+        self.address = self.listener.getsockname()
+        self.poll_interval = prefork.POLL_INTERVAL
+        self.min_lifetime = prefork.MIN_WORKER_LIFETIME
+        prefork.POLL_INTERVAL = 0.05
+        prefork.MIN_WORKER_LIFETIME = 0
+        self.handlers = (signal.getsignal(signal.SIGTERM),
+                         signal.getsignal(signal.SIGINT))
+
+    def tearDown(self):
+        self.listener.close()
+        prefork.POLL_INTERVAL = self.poll_interval
+        prefork.MIN_WORKER_LIFETIME = self.min_lifetime
+        signal.signal(signal.SIGTERM, self.handlers[0])
+        signal.signal(signal.SIGINT, self.handlers[1])
+
+    def testWorker(self):
+        '''Test worker recycled after requests handled, not timeouts'''
+        forked = []
+        dispatcher.channel(prefork.POST_FORK, forked.extend)
+        responses = []
+
+        def requests():
+            for _ in range(2):
+                # Let worker wait for requests a few timeouts
+                time.sleep(0.2)
+                responses.append(get(self.address))
+        client = threading.Thread(target=requests)
+        client.start()
+        try:
+            prefork.Worker(application, self.listener, 3,
+                           max_requests=2).run()
+        finally:
+            client.join()
+            dispatcher.close(prefork.POST_FORK, forked.extend)
+        assert forked == [3], 'Wrong post fork signal: %s' % forked
+        assert len(responses) == 2, 'Worker exited before requests handled'
+
+    def testMaster(self):
+        '''Test master replaces recycled workers and stops them'''
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                prefork.Master(application, self.listener, 1,
+                               max_requests=1).run()
+            except Exception:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        try:
+            workers = [get(self.address) for _ in range(3)]
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            _, status = os.waitpid(pid, 0)
+        assert len(set(workers)) == 3, (
+                'Worker was not replaced: %s' % workers)
+        assert status == 0, 'Wrong master exit status: %s' % status
+
+    def testStop(self):
+        '''Test master stopped without waiting for workers exit'''
+        pid = os.fork()
+        if pid == 0:
+            try:
+                prefork.Master(application, self.listener, 1).run()
+            finally:
+                os._exit(0)
+        try:
+            get(self.address)
+        finally:
+            os.kill(pid, signal.SIGTERM)
+        for _ in range(20):
+            exited, _ = os.waitpid(pid, os.WNOHANG)
+            if exited:
+                break
+            time.sleep(0.1)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            assert False, 'Master was not stopped'
+
+    def testMemory(self):
+        '''Test memory limit applied to memory allocated after fork'''
+        worker = prefork.Worker(application, self.listener, 0, max_memory=8)
+        worker.initial_memory = prefork.get_memory_usage()
+        assert not worker.should_recycle(0), (
+                'Worker recycled before memory allocation')
+        data = bytearray(32 * 1024 * 1024)
+        try:
+            assert worker.should_recycle(0), (
+                    'Worker was not recycled after memory allocation')
+        finally:
+            del data
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(PreforkTestCase('testWorker'))
+    suite.addTest(PreforkTestCase('testMaster'))
+    suite.addTest(PreforkTestCase('testStop'))
+    suite.addTest(PreforkTestCase('testMemory'))
+    return suite
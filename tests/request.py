@@ -1,13 +1,21 @@
 '''Test case for Request class
 '''
+import functools
+from io import BytesIO
 import unittest
 
-from lighty.wsgi.http import Request
+from lighty.cache import manager as cache_manager
+from lighty.wsgi.decorators import cache_page
+from lighty.wsgi.forms import parse_multipart
+from lighty.wsgi.handler import handler
+from lighty.wsgi.http import Request, Response, StreamingResponse
 
 CSRFTOKEN = '48831b11aea954cd93464468553ecc6c'
 CLTRACK = 'rbr6t7nud3etn90f38j3f3n4i2'
 UTMA = '96992031.112838200.1323767133.1330596387.1330599154.22'
 UTMZ = '96992031.1323767133.1.1.utmcsr=(direct)|utmccn=(direct)|utmcmd=(none)'
+FORM_TYPE = 'application/x-www-form-urlencoded'
+FORM_DATA = 'name=Peter&tag=a&tag=b'
 COOKIE_STRING = 'CLTRACK=%s; __utma=%s; __utmz=%s; csrftoken=%s' % (CLTRACK,
         UTMA, UTMZ, CSRFTOKEN)
 
@@ -21,6 +29,10 @@ class RequestTestCase(unittest.TestCase):
             'REQUEST_METHOD': 'get',
             'PATH_INFO': '/hello/world',
             'QUERY_STRING': 'a=1&b=text',
+            'HTTP_ACCEPT_LANGUAGE': 'en',
+            'CONTENT_TYPE': FORM_TYPE,
+            'CONTENT_LENGTH': str(len(FORM_DATA)),
+            'wsgi.input': BytesIO(FORM_DATA.encode('utf-8')),
         }
         self.request = Request(self, self.environ)
 
@@ -50,8 +62,44 @@ class RequestTestCase(unittest.TestCase):
 
     def testHeaders(self):
         '''Test request headers'''
-        # TODO: write valid code here
-        pass
+        assert self.request.headers['Accept-Language'] == 'en', (
+                'Wrong header "Accept-Language": %s' %
+                self.request.headers['Accept-Language'])
+        assert self.request.headers['Content-Type'] == FORM_TYPE, (
+                'Wrong header "Content-Type": %s' %
+                self.request.headers['Content-Type'])
+
+    def testLazyParsing(self):
+        '''Test request data is not parsed until accessed'''
+        request = Request(self, {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'})
+        assert request._cookies is None and request._params is None, (
+                'Request data parsed on request creation')
+        assert request.params == {} and request.cookies == {}, (
+                'Wrong empty request data')
+
+    def testMultipartForm(self):
+        '''Test multipart form parsing with small chunks'''
+        body = ('preamble\r\n--AaB03x\r\n'
+                'Content-Disposition: form-data; name="name"\r\n\r\n'
+                'Peter\r\n--AaB03x\r\n'
+                'Content-Disposition: form-data; name="file"; '
+                'filename="file.txt"\r\nContent-Type: text/plain\r\n\r\n'
+                'Hello,\r\nworld!\r\n--AaB03x--\r\n').encode('utf-8')
+        fields, files = parse_multipart(
+                [body[i:i + 7] for i in range(0, len(body), 7)], 'AaB03x')
+        assert fields == {'name': 'Peter'}, 'Wrong form fields: %s' % fields
+        upload = files['file']
+        assert upload.filename == 'file.txt', (
+                'Wrong file name: %s' % upload.filename)
+        data = upload.read()
+        assert data == 'Hello,\r\nworld!'.encode('utf-8'), (
+                'Wrong file data: %s' % data)
+        upload.close()
+
+    def testForm(self):
+        '''Test url encoded form parsing'''
+        assert self.request.form == {'name': 'Peter', 'tag': ['a', 'b']}, (
+                'Wrong form data: %s' % self.request.form)
 
     def testRequestParams(self):
         '''Test all the methods to access request as params'''
@@ -70,6 +118,85 @@ class RequestTestCase(unittest.TestCase):
 
 
 
+class ResponseTestCase(unittest.TestCase):
+    '''Test case for response classes
+    '''
+
+    def testResponse(self):
+        '''Test response iteration returns the whole data'''
+        parts = [part for part in Response('Hello, world!')]
+        assert parts == ['Hello, world!'], 'Wrong response parts: %s' % parts
+
+    def testStreamingResponse(self):
+        '''Test streaming response returns data by parts'''
+        response = StreamingResponse((chunk for chunk in ('Hello', ', ', 1)))
+        parts = [part for part in response]
+        assert parts == ['Hello', ', ', '1'], 'Wrong response parts: %s' % (
+                                              parts, )
+        response.close()
+
+
+class PageCacheTestCase(unittest.TestCase):
+    '''Test case for whole page caching
+    '''
+
+    def setUp(self):
+        cache_manager.get_cache().clear()
+        self.calls = []
+
+        @cache_page(60, vary=('Accept-Language', ))
+        def cached_view(request):
+            self.calls.append(request.path)
+            return 'Page %d' % len(self.calls)
+        self.view = cached_view
+
+    def request(self, method='GET', language='en'):
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': '/cached',
+                   'QUERY_STRING': '', 'HTTP_ACCEPT_LANGUAGE': language}
+        resolve_url = lambda path, method: functools.partial(self.view)
+        response = handler(self, resolve_url, environ, lambda s, h: None)
+        return response.finish()
+
+    def testCachedPage(self):
+        '''Test view is not executed for cached page'''
+        assert self.request() == 'Page 1', 'Wrong page'
+        assert self.request() == 'Page 1', 'Page was not cached'
+        assert len(self.calls) == 1, 'View was executed for cached page'
+
+    def testVary(self):
+        '''Test cache varies on headers and does not cache POST requests'''
+        assert self.request(language='ru') == 'Page 1', 'Wrong page'
+        assert self.request(language='de') == 'Page 2', (
+                'Cache does not vary on header')
+        assert self.request('POST', 'ru') == 'Page 3', 'POST was cached'
+
+    def testVaryHeader(self):
+        '''Test Vary header sent and responses vary on other headers are not
+        cached'''
+        headers = []
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/cached',
+                   'QUERY_STRING': '', 'HTTP_ACCEPT_LANGUAGE': 'en'}
+        resolve_url = lambda path, method: functools.partial(self.view)
+        for _ in range(2):
+            handler(self, resolve_url, environ,
+                    lambda status, response_headers: headers.append(
+                                                    dict(response_headers)))
+        assert [h.get('Vary') for h in headers] == ['Accept-Language'] * 2, (
+                'Wrong Vary header: %s' % headers)
+
+        @cache_page(60, vary=('Accept-Language', ))
+        def encoded_view(request):
+            self.calls.append(request.path)
+            return Response('Page %d' % len(self.calls), 200,
+                            [('Vary', 'Accept-Encoding')])
+        cache_manager.get_cache().clear()
+        self.calls = []
+        self.view = encoded_view
+        assert self.request() == 'Page 1', 'Wrong page'
+        assert self.request() == 'Page 2', (
+                'Response varies on header not in cache key was cached')
+
+
 def test():
     suite = unittest.TestSuite()
     suite.addTest(RequestTestCase('testApp'))
@@ -77,6 +204,14 @@ def test():
     suite.addTest(RequestTestCase('testPathInfo'))
     suite.addTest(RequestTestCase('testCookies'))
     suite.addTest(RequestTestCase('testHeaders'))
+    suite.addTest(RequestTestCase('testLazyParsing'))
+    suite.addTest(RequestTestCase('testForm'))
+    suite.addTest(RequestTestCase('testMultipartForm'))
     suite.addTest(RequestTestCase('testRequestParams'))
     suite.addTest(RequestTestCase('testRequestParamsAccess'))
+    suite.addTest(ResponseTestCase('testResponse'))
+    suite.addTest(ResponseTestCase('testStreamingResponse'))
+    suite.addTest(PageCacheTestCase('testCachedPage'))
+    suite.addTest(PageCacheTestCase('testVary'))
+    suite.addTest(PageCacheTestCase('testVaryHeader'))
     return suite
@@ -0,0 +1,138 @@
+'''Test case for static files serving
+'''
+import gzip
+from io import BytesIO
+import os.path
+import unittest
+
+from lighty.conf import Settings as ConfSettings
+from lighty.wsgi import static
+from lighty.wsgi.http import Request
+from lighty.wsgi.static import StaticCache, static_view
+
+STATIC_ROOT = 'tests/templates'
+
+
+class Settings(dict):
+    '''Settings with static files options
+    '''
+    __getattr__ = dict.__getitem__
+
+
+class StaticTestCase(unittest.TestCase):
+    '''Test case for static view
+    '''
+
+    def setUp(self):
+        self.settings = Settings(static_url='localhost/static/',
+                                 static_root=STATIC_ROOT)
+        with open(os.path.join(STATIC_ROOT, 'simple.html'), 'rb') as file:
+            self.data = file.read()
+
+    def request(self, path, **headers):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/static/' + path,
+                   'HTTP_HOST': 'localhost'}
+        environ.update(headers)
+        response = static_view(Request(self, environ), path)
+        data = response.finish()
+        if hasattr(response, 'close'):
+            response.close()
+        return response.code, dict(response.headers), data
+
+    def testFile(self):
+        '''Test file sent with caching headers'''
+        code, headers, data = self.request('simple.html')
+        assert code == 200, 'Wrong response code: %s' % code
+        assert data == self.data, 'Wrong file data: %s' % data
+        assert 'ETag' in headers and 'Last-Modified' in headers, (
+                'Caching headers are not set: %s' % headers)
+        assert headers['Content-Length'] == str(len(self.data)), (
+                'Wrong content length: %s' % headers['Content-Length'])
+
+    def testNotModified(self):
+        '''Test conditional requests'''
+        _, headers, _ = self.request('simple.html')
+        code, _, _ = self.request('simple.html',
+                                  HTTP_IF_NONE_MATCH=headers['ETag'])
+        assert code == 304, 'Wrong response code for If-None-Match: %s' % code
+        code, _, _ = self.request('simple.html',
+                            HTTP_IF_MODIFIED_SINCE=headers['Last-Modified'])
+        assert code == 304, ('Wrong response code for If-Modified-Since: %s' %
+                             code)
+
+    def testRange(self):
+        '''Test range requests'''
+        code, headers, data = self.request('simple.html',
+                                           HTTP_RANGE='bytes=1-3')
+        assert code == 206, 'Wrong response code: %s' % code
+        assert data == self.data[1:4], 'Wrong range data: %s' % data
+        code, _, data = self.request('simple.html', HTTP_RANGE='bytes=-2')
+        assert data == self.data[-2:], 'Wrong suffix range data: %s' % data
+        code, _, _ = self.request('simple.html', HTTP_RANGE='bytes=1000-')
+        assert code == 416, 'Wrong response code: %s' % code
+
+    def testNotFound(self):
+        '''Test files outside of static root are not served'''
+        code, _, _ = self.request('../conf.py')
+        assert code == 404, 'File outside of static root was served'
+
+    def testSettings(self):
+        '''Test static files served with settings from configuration'''
+        self.settings = ConfSettings('tests/test.cfg')
+        static.static_cache = None
+        code, _, data = self.request('tests/templates/simple.html')
+        assert code == 200, 'Wrong response code: %s' % code
+        assert data == self.data, 'Wrong file data: %s' % data
+        assert static.static_cache is False, (
+                'Disabled cache was not remembered: %s' % static.static_cache)
+        static.static_cache = None
+
+    def testCache(self):
+        '''Test static files cache with compressed variants'''
+        with open(os.path.join(STATIC_ROOT, 'base.html'), 'rb') as file:
+            expected = file.read()
+        path = os.path.realpath(os.path.join(STATIC_ROOT, 'base.html'))
+        cache = StaticCache(1024 * 1024)
+        static.static_cache = cache
+        try:
+            _, headers, data = self.request('base.html',
+                                            HTTP_ACCEPT_ENCODING='gzip')
+            assert path in cache.entries, 'File was not cached'
+            assert headers['Content-Encoding'] == 'gzip', (
+                    'Compressed file was not sent')
+            assert headers['Vary'] == 'Accept-Encoding', (
+                    'Vary header was not set: %s' % headers)
+            data = gzip.GzipFile(fileobj=BytesIO(data)).read()
+            assert data == expected, 'Wrong compressed file data: %s' % data
+            gzip_etag = headers['ETag']
+            _, headers, data = self.request('base.html',
+                                            HTTP_ACCEPT_ENCODING='gzip;q=0')
+            assert 'Content-Encoding' not in headers and data == expected, (
+                    'Compressed file sent to client does not accept it')
+            assert headers['ETag'] != gzip_etag, (
+                    'Same ETag for compressed and identity data')
+            code, headers, data = self.request('base.html',
+                                               HTTP_ACCEPT_ENCODING='gzip',
+                                               HTTP_RANGE='bytes=1-3')
+            assert code == 206 and data == expected[1:4], (
+                    'Wrong range of cached file: %s' % data)
+            assert 'Content-Encoding' not in headers, (
+                    'Range of compressed data was sent')
+            entry = cache.entries[path]
+            entry.mtime -= 1
+            self.request('base.html')
+            assert cache.entries[path] is not entry, (
+                    'Modified file was not reloaded')
+        finally:
+            static.static_cache = None
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(StaticTestCase('testFile'))
+    suite.addTest(StaticTestCase('testNotModified'))
+    suite.addTest(StaticTestCase('testRange'))
+    suite.addTest(StaticTestCase('testNotFound'))
+    suite.addTest(StaticTestCase('testSettings'))
+    suite.addTest(StaticTestCase('testCache'))
+    return suite
@@ -0,0 +1,55 @@
+'''Test case for streaming template rendering
+'''
+import unittest
+
+from lighty.templates import Template
+from lighty.templates.loaders import FSLoader
+
+
+class StreamTestCase(unittest.TestCase):
+    '''Test case for Template.stream() method
+    '''
+
+    def assertChunks(self, template, context, chunks):
+        result = [chunk for chunk in template.stream(context)]
+        assert result == chunks, 'Wrong stream chunks: %s except %s' % (
+                                 result, chunks)
+        executed = template.execute(context)
+        assert executed == ''.join(chunks), (
+                'Stream result differs from execute(): %s' % executed)
+
+    def testSimpleStream(self):
+        '''Test streaming of template with variables'''
+        template = Template('Hello, {{ name }}!')
+        self.assertChunks(template, {'name': 'Peter'},
+                          ['Hello, ', 'Peter', '!'])
+
+    def testForStream(self):
+        '''Test for tag streamed by iterations'''
+        template = Template('<ul>{% for a in list %}<li>{{ a }}</li>'
+                            '{% endfor %}</ul>')
+        self.assertChunks(template, {'list': [1, 2]},
+                          ['<ul>', '<li>1</li>', '<li>2</li>', '</ul>'])
+
+    def testIfStream(self):
+        '''Test if tag streaming'''
+        template = Template('{% if a %}{{ a }}{% endif %}.')
+        self.assertChunks(template, {'a': 1}, ['1', '.'])
+        self.assertChunks(template, {'a': 0}, ['.'])
+
+    def testIncludeStream(self):
+        '''Test include tag streams included template'''
+        template = Template('{% include "simple.html" %}', name="test.html",
+                            loader=FSLoader(['tests/templates']))
+        result = ''.join(template.stream({'name': 'Peter'}))
+        assert result.strip() == 'Hello, Peter', 'Wrong include stream: %s' % (
+                                                 result, )
+
+
+def test():
+    suite = unittest.TestSuite()
+    suite.addTest(StreamTestCase('testSimpleStream'))
+    suite.addTest(StreamTestCase('testForStream'))
+    suite.addTest(StreamTestCase('testIfStream'))
+    suite.addTest(StreamTestCase('testIncludeStream'))
+    return suite
@@ -2,7 +2,7 @@
 '''
 import unittest
 
-from lighty.wsgi.urls import resolve, reverse, url
+from lighty.wsgi.urls import Dispatcher, resolve, reverse, url
 
 def no_arg_func(): return ''
 def one_arg_func(arg): return str(arg)
@@ -106,6 +106,51 @@ class PatternMatchingTestCase(unittest.TestCase):
                 '"twoargs" and args: {"action": "get", "id": 1}: %s' % url)
 
 
+class DispatcherTestCase(PatternMatchingTestCase):
+    '''Test case for url dispatcher
+    '''
+
+    def testDispatcher(self):
+        '''Test dispatcher resolves paths the same way as resolve does'''
+        urls = self.urls + (
+                url('/test/', one_arg_func, defaults={'arg': 1}),
+                url('/post/([\\d]+)|/p/([\\d]+)', no_arg_func),
+                url('/posts?/', no_arg_func, methods=['POST']),
+        )
+        dispatcher = Dispatcher(urls)
+        for method in ('GET', 'POST', None):
+            for path in ('/test/', '/arg/12', '/arg/12.3', '/arg/a',
+                         '/arg/a-1', '/default_arg/adftr/', '/args/test/7/',
+                         '/1/test/7/', '/g/g/g/', '/p/1', '/post/', '/pos/',
+                         '/posts/', ''):
+                expected = resolve(urls, path, method)
+                result = dispatcher.resolve(path, method)
+                if not expected:
+                    assert not result, 'Wrong url resolved for %s' % path
+                    continue
+                assert (result.func == expected.func and
+                        result.keywords == expected.keywords), (
+                        'Wrong url resolved for %s %s: %s' % (method, path,
+                                                              result.func))
+
+    def testDispatcherReverse(self):
+        '''Test dispatcher reverses urls the same way as reverse does'''
+        urls = self.urls + (
+                url('/100%', no_arg_func, name='percent'),
+                url('/100%/<id>', one_arg_func, name='percent'),
+        )
+        dispatcher = Dispatcher(urls)
+        for name, args in (('noargs', None), ('onearg', {'id': 10}),
+                           ('onearg', {'name': 'Peter'}),
+                           ('twoargs', {'action': 'get', 'id': 1}),
+                           ('noneonearg', {'id': 10}),
+                           ('percent', None), ('percent', {'id': 1})):
+            expected = reverse(urls, name, args)
+            result = dispatcher.reverse(name, args)
+            assert (result == expected if expected else not result), (
+                    'Wrong url reversed for %s: %s' % (name, result))
+
+
 def test():
     suite = unittest.TestSuite()
     suite.addTest(PatternMatchingTestCase('testSimpleUrl'))
@@ -118,4 +163,6 @@ def test():
     suite.addTest(PatternMatchingTestCase('testReverseNoArgsUrl'))
     suite.addTest(PatternMatchingTestCase('testReverseOneArgUrl'))
     suite.addTest(PatternMatchingTestCase('testReverseTwoArgUrl'))
+    suite.addTest(DispatcherTestCase('testDispatcher'))
+    suite.addTest(DispatcherTestCase('testDispatcherReverse'))
     return suite
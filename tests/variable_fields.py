@@ -47,6 +47,36 @@ class VariableFieldTestCase(unittest.TestCase):
         result = self.deep_template.execute({'object': TestClass()})
         self.assertResult(result)
 
+    def testCachedAccess(self):
+        '''Test field access for objects of the same class with and without
+        instance attribute'''
+        class TestClass(dict):
+            pass
+        with_attribute = TestClass()
+        with_attribute.field = self.value
+        with_item = TestClass(field=self.value)
+        for obj in (with_attribute, with_item, with_attribute, with_item):
+            result = self.object_field_template.execute({'object': obj})
+            self.assertResult(result)
+
+    def testCachedSlotAccess(self):
+        '''Test field access for objects with and without slot value set'''
+        class TestClass(object):
+            __slots__ = ('field', )
+
+            def __getitem__(self, name):
+                return 'item'
+
+            def __contains__(self, name):
+                return True
+        without_slot = TestClass()
+        with_slot = TestClass()
+        with_slot.field = self.value
+        result = self.object_field_template.execute({'object': without_slot})
+        assert result == 'item', 'Wrong item access result: %s' % result
+        result = self.object_field_template.execute({'object': with_slot})
+        self.assertResult(result)
+
 
 def test():
     suite = unittest.TestSuite()
@@ -54,4 +84,6 @@ def test():
     suite.addTest(VariableFieldTestCase('testObjectField'))
     suite.addTest(VariableFieldTestCase('testDictValue'))
     suite.addTest(VariableFieldTestCase('testMultilevelField'))
+    suite.addTest(VariableFieldTestCase('testCachedAccess'))
+    suite.addTest(VariableFieldTestCase('testCachedSlotAccess'))
     return suite